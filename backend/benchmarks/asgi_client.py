@@ -0,0 +1,69 @@
+import asyncio
+import json
+import math
+import os
+import sys
+import time
+
+# Make the backend modules importable when running `python benchmarks/<script>.py`
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+async def call(app, method, path, body=None, headers=None):
+    """Sends one request straight into an ASGI app. Returns (status, headers, body bytes)."""
+    payload = json.dumps(body).encode() if body is not None else b''
+    raw_headers = [(b'content-type', b'application/json')]
+    for name, value in (headers or {}).items():
+        raw_headers.append((name.lower().encode(), value.encode()))
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query.encode(),
+        'headers': raw_headers,
+        'client': ('127.0.0.1', 12345),
+        'server': ('testserver', 80),
+    }
+    sent = False
+    response = {'status': None, 'headers': {}, 'body': b''}
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {'type': 'http.request', 'body': payload, 'more_body': False}
+        # Block like a real server would while the client stays connected
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+            response['headers'] = {k.decode(): v.decode() for k, v in message.get('headers', [])}
+        elif message['type'] == 'http.response.body':
+            response['body'] += message.get('body', b'')
+
+    await app(scope, receive, send)
+    return response['status'], response['headers'], response['body']
+
+
+async def timed_call(app, method, path, body=None, headers=None):
+    """Like call(), but returns (status, seconds)."""
+    start = time.perf_counter()
+    status, _, _ = await call(app, method, path, body, headers)
+    return status, time.perf_counter() - start
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    # Nearest-rank percentile
+    k = max(0, math.ceil(pct / 100.0 * len(ordered)) - 1)
+    return ordered[k]
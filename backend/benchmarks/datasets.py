@@ -0,0 +1,122 @@
+"""Synthetic seekers, employers and jobs for the benchmarks.
+
+Records have the same shape as the ones the signup endpoints and jobs.json
+store, and are deterministic for a given seed. Every account's password is
+PASSWORD; hash it once and pass the hash as password_hash to skip hashing
+a million passwords.
+
+    python benchmarks/datasets.py --users 100000 --jobs 10000 --out /tmp/bench-data
+"""
+import argparse
+import json
+import os
+import random
+
+from asgi_client import BACKEND_DIR  # noqa: F401  (puts the backend on sys.path)
+
+PASSWORD = 'bench-password'
+
+SKILLS = [
+    'Python', 'SQL', 'React', 'Go', 'Docker', 'AWS', 'Statistics', 'Java', 'Figma', 'Excel',
+    'JavaScript', 'Node.js', 'Kubernetes', 'Machine Learning', 'Data Analysis', 'TypeScript',
+]
+TITLES = ['Software Engineer', 'Data Scientist', 'Product Designer', 'DevOps Engineer', 'Data Analyst', 'QA Engineer']
+LOCATIONS = ['New York, NY', 'San Francisco, CA', 'Berlin', 'London', 'Remote', 'Kuala Lumpur']
+JOB_TYPES = ['Full-time', 'Part-time', 'Contract', 'Internship']
+INDUSTRIES = ['Software', 'Finance', 'Healthcare', 'Retail', 'Education']
+
+
+def make_seekers(count, seed=0, password_hash=PASSWORD, start=0):
+    rng = random.Random(seed)
+    return [{
+        'role': 'seeker',
+        'name': f'Seeker {i}',
+        'email': f'seeker{i}@example.com',
+        'password': password_hash,
+        'phone': f'555-{i:07d}',
+        'created_at': '2024-05-01 12:00:00.000000',
+        'job_title': rng.choice(TITLES),
+        'experience': f'{rng.randint(0, 20)} years',
+        'skills': rng.sample(SKILLS, rng.randint(1, 6)),
+        'location': rng.choice(LOCATIONS),
+        'resume_url': f'https://example.com/resume/{i}.pdf',
+    } for i in range(start, start + count)]
+
+
+def make_employers(count, seed=0, password_hash=PASSWORD, start=0):
+    rng = random.Random(seed + 1)
+    return [{
+        'role': 'employer',
+        'name': f'Company {i}',
+        'email': f'employer{i}@example.com',
+        'password': password_hash,
+        'phone': f'556-{i:07d}',
+        'created_at': '2024-05-01 12:00:00.000000',
+        'industry': rng.choice(INDUSTRIES),
+        'company_size': rng.choice(['1-10', '11-50', '51-200', '201-1000', '1000+']),
+        'company_website': f'https://company{i}.example.com',
+        'company_location': rng.choice(LOCATIONS),
+        'company_description': f'Company {i} builds things.',
+        'contact_person': f'Contact {i}',
+    } for i in range(start, start + count)]
+
+
+def make_users(count, seed=0, password_hash=PASSWORD, employer_share=0.1):
+    """Seekers and employers in a fixed ratio."""
+    employers = int(count * employer_share)
+    return make_seekers(count - employers, seed, password_hash) + make_employers(employers, seed, password_hash)
+
+
+def make_jobs(count, seed=0, companies=1000):
+    rng = random.Random(seed + 2)
+    jobs = []
+    for i in range(1, count + 1):
+        title = rng.choice(TITLES)
+        skills = rng.sample(SKILLS, rng.randint(2, 6))
+        jobs.append({
+            'id': str(i),
+            'title': title,
+            'description': f"We are hiring a {title} to work with {', '.join(skills)}. " * rng.randint(1, 4),
+            'required_skills': skills,
+            'company': f'Company {rng.randrange(companies)}',
+            'location': rng.choice(LOCATIONS),
+            'salary_range': f'${rng.randint(40, 120)},000 - ${rng.randint(121, 250)},000',
+            'job_type': rng.choice(JOB_TYPES),
+        })
+    return jobs
+
+
+def write_dataset(directory, users, jobs, seed=0, password_hash=PASSWORD):
+    """Writes users.db and jobs.json into directory. Returns (users_db, jobs_file)."""
+    from user_store import UserStore
+
+    os.makedirs(directory, exist_ok=True)
+    users_db = os.path.join(directory, 'users.db')
+    jobs_file = os.path.join(directory, 'jobs.json')
+    store = UserStore(users_db, legacy_json_path=None)
+    batch = 50000
+    for start in range(0, users, batch):
+        # Generate in batches to keep memory flat for the 1M-user datasets
+        size = min(batch, users - start)
+        employers = int(size * 0.1)
+        store.add_many(
+            make_seekers(size - employers, seed + start, password_hash, start)
+            + make_employers(employers, seed + start, password_hash, start)
+        )
+    store.close()
+    with open(jobs_file, 'w') as f:
+        json.dump(make_jobs(jobs, seed), f, indent=4)
+    return users_db, jobs_file
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--jobs', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', required=True)
+    args = parser.parse_args()
+
+    from passwords import PasswordHasher
+    users_db, jobs_file = write_dataset(args.out, args.users, args.jobs, args.seed, PasswordHasher().hash(PASSWORD))
+    print(f"Wrote {args.users} users to {users_db} and {args.jobs} jobs to {jobs_file}")
@@ -0,0 +1,109 @@
+"""Stress test: many parallel signup clients writing one users.json.
+
+Starts --processes worker processes with --threads threads each; every thread
+signs up --signups users through src/signup.py's signup_user, plus one retry
+of an email another client also uses. Each acknowledged signup is appended to
+a per-worker log. Afterwards the users file must parse, hold no duplicate
+emails, and contain every acknowledged signup. --kill SIGKILLs one worker
+mid-run to check that a crash can't corrupt or truncate the file.
+
+    python benchmarks/json_store_stress.py --processes 4 --threads 8 --signups 25 --kill
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import signal
+import sys
+import tempfile
+import threading
+import time
+
+from asgi_client import BACKEND_DIR
+
+SRC_DIR = os.path.join(os.path.dirname(BACKEND_DIR), 'src')
+
+
+def worker(worker_id, args, users_file, log_dir):
+    # Hashing isn't what's under test; keep it cheap
+    os.environ['PASSWORD_SCRYPT_N'] = '16'
+    sys.path.insert(0, SRC_DIR)
+    import signup
+    from json_store import JsonFileStore
+
+    signup.users_store = JsonFileStore(users_file)
+    # signup_user prints every result
+    sys.stdout = open(os.devnull, 'w')
+    log = open(os.path.join(log_dir, f'{worker_id}.log'), 'a')
+    log_lock = threading.Lock()
+
+    def client(thread_id):
+        for i in range(args.signups):
+            email = f'w{worker_id}-t{thread_id}-{i}@example.com'
+            if i == 0:
+                # Every client races for the same shared email once
+                email = 'shared@example.com'
+            ok = signup.signup_user('seeker', f'User {email}', email, 'pw', skills=['Python'])
+            if ok:
+                with log_lock:
+                    log.write(email + '\n')
+                    log.flush()
+
+    threads = [threading.Thread(target=client, args=(t,)) for t in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    log.close()
+    print(f"worker {worker_id}: {signup.users_store.store_stats()}", file=sys.__stdout__)
+
+
+def verify(users_file, log_dir):
+    with open(users_file) as f:
+        users = json.load(f)
+    emails = [user['email'] for user in users]
+    acknowledged = []
+    for name in os.listdir(log_dir):
+        with open(os.path.join(log_dir, name)) as f:
+            acknowledged += f.read().split()
+    duplicates = len(emails) - len(set(emails))
+    missing = set(acknowledged) - set(emails)
+    print(f"{len(users)} users on disk, {len(acknowledged)} acknowledged signups, "
+          f"{duplicates} duplicates, {len(missing)} lost")
+    return duplicates == 0 and not missing and acknowledged.count('shared@example.com') <= 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--signups', type=int, default=25, help="signups per client thread")
+    parser.add_argument('--kill', action='store_true', help="SIGKILL one worker mid-run")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    users_file = os.path.join(directory, 'users.json')
+    log_dir = os.path.join(directory, 'acks')
+    os.mkdir(log_dir)
+
+    start = time.perf_counter()
+    processes = [
+        multiprocessing.Process(target=worker, args=(i, args, users_file, log_dir))
+        for i in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    if args.kill:
+        time.sleep(random.uniform(0.2, 0.5))
+        os.kill(processes[0].pid, signal.SIGKILL)
+        print(f"killed worker 0 (pid {processes[0].pid})")
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - start
+
+    attempted = args.processes * args.threads * args.signups
+    print(f"{attempted} signups attempted in {elapsed:.2f}s ({attempted / elapsed:.0f}/s)")
+    ok = verify(users_file, log_dir)
+    print("OK" if ok else "FAILED")
+    sys.exit(0 if ok else 1)
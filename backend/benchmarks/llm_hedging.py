@@ -0,0 +1,90 @@
+"""Tail latency of question generation through LLMRouter, with and without hedging and fallback.
+
+Each scenario sends --requests prompts, --concurrency at a time, through a
+router over StubModel providers. The primary stalls for --stall seconds on
+--stall-rate of its calls; the "failing" scenarios also make it raise on
+--error-rate of them. Reports latency percentiles, failed requests and how
+many model calls were made (the cost of hedging).
+
+    python benchmarks/llm_hedging.py --requests 400 --stall-rate 0.05 --stall 3
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+from asgi_client import percentile
+from stub_model import StubModel
+
+from llm import LLMClient
+from llm_router import LLMRouter, Provider
+
+
+def provider(name, model, timeout):
+    return Provider(name, LLMClient(lambda: model, concurrency=64, queue_size=1024, timeout=timeout))
+
+
+def scenarios(args):
+    def primary(error_rate=0.0, seed=0):
+        return StubModel(latency=args.latency, jitter=args.jitter, stall_rate=args.stall_rate, stall=args.stall,
+                         error_rate=error_rate, seed=seed)
+
+    def local():
+        return StubModel(latency=args.latency * 2, jitter=args.jitter, seed=1)
+
+    def router(providers, hedge):
+        return LLMRouter(providers, timeout=args.timeout, hedge_percentile=95 if hedge else None,
+                         hedge_delay=args.hedge_delay, hedge_self=hedge)
+
+    yield 'single', router([provider('primary', primary(), args.timeout)], hedge=False)
+    yield 'single hedged', router([provider('primary', primary(), args.timeout)], hedge=True)
+    yield 'failing', router([provider('primary', primary(args.error_rate), args.timeout)], hedge=False)
+    yield 'failing + local', router([
+        provider('primary', primary(args.error_rate), args.timeout), provider('local', local(), args.timeout),
+    ], hedge=True)
+
+
+async def measure(router, count, concurrency):
+    latencies = []
+    failures = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await router.generate(f"Job ID: {i}\nWrite 5 interview questions")
+            except Exception:
+                failures += 1
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one(i) for i in range(count)))
+    return latencies, failures
+
+
+async def run(args):
+    # One warning per failed call would drown the table
+    logging.disable(logging.WARNING)
+    print(f"{'scenario':<18}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'failed':>8}{'calls':>7}{'hedges':>8}")
+    for name, router in scenarios(args):
+        latencies, failures = await measure(router, args.requests, args.concurrency)
+        calls = sum(p.client.client_stats()['calls'] for p in router.providers)
+        print(f"{name:<18}"
+              f"{percentile(latencies, 50) * 1000:>9.0f}{percentile(latencies, 95) * 1000:>9.0f}"
+              f"{percentile(latencies, 99) * 1000:>9.0f}{max(latencies) * 1000:>9.0f}"
+              f"{failures:>8}{calls:>7}{router.stats['hedges']:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--jitter', type=float, default=0.1)
+    parser.add_argument('--stall-rate', type=float, default=0.05)
+    parser.add_argument('--stall', type=float, default=3.0)
+    parser.add_argument('--error-rate', type=float, default=0.2)
+    parser.add_argument('--hedge-delay', type=float, default=1.0)
+    parser.add_argument('--timeout', type=float, default=10.0)
+    asyncio.run(run(parser.parse_args()))
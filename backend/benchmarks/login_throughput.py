@@ -0,0 +1,89 @@
+"""Load test: /api/login throughput and latency with hashed passwords.
+
+Runs the FastAPI app in-process with --users hashed accounts and fires
+--logins logins at --concurrency, then reports logins/sec and p50/p99, plus
+the p99 of a cheap endpoint (/api/stats/llm) hit while the logins run, which
+shows whether password hashing is blocking the event loop.
+
+--mode picks where verification runs:
+    pool       PasswordHasher's thread pool, as the app does (default)
+    inline     scrypt on the event loop, the naive way to add hashing
+    plaintext  the old plaintext comparison, for the "before" numbers
+
+    python benchmarks/login_throughput.py --logins 200 --concurrency 32
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from asgi_client import percentile, timed_call
+
+
+async def run(args):
+    import main
+    from passwords import PasswordHasher
+    from user_store import UserStore
+
+    hasher = PasswordHasher(n=args.scrypt_n, workers=args.workers or None)
+    main.password_hasher = hasher
+    if args.mode == 'inline':
+        async def verify_inline(password, stored):
+            return hasher.verify(password, stored)
+        hasher.verify_async = verify_inline
+
+    main.user_store = UserStore(os.path.join(tempfile.mkdtemp(), 'users.db'), legacy_json_path=None)
+    passwords = [f'password-{i}' for i in range(args.users)]
+    stored = passwords if args.mode == 'plaintext' else hasher.hash_many(passwords)
+    main.user_store.add_many([
+        {'email': f'user{i}@example.com', 'password': stored[i], 'name': f'User {i}', 'role': 'seeker'}
+        for i in range(args.users)
+    ])
+    if args.mode == 'plaintext':
+        # Keep the records plaintext for every login instead of upgrading them on the first one
+        hasher.needs_rehash = lambda stored: False
+
+    latencies = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(i):
+        async with semaphore:
+            body = {'email': f'user{i % args.users}@example.com', 'password': f'password-{i % args.users}'}
+            status, seconds = await timed_call(main.app, 'POST', '/api/login', body)
+            assert status == 200, status
+            latencies.append(seconds)
+
+    probes = []
+    done = asyncio.Event()
+
+    async def probe():
+        while not done.is_set():
+            status, seconds = await timed_call(main.app, 'GET', '/api/stats/llm')
+            assert status == 200, status
+            probes.append(seconds)
+            await asyncio.sleep(0.01)
+
+    prober = asyncio.ensure_future(probe())
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.logins)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await prober
+
+    print(f"mode={args.mode} scrypt_n={args.scrypt_n} workers={hasher.workers} concurrency={args.concurrency}")
+    print(f"login  {args.logins / elapsed:8.1f}/s  p50={percentile(latencies, 50) * 1000:8.2f}ms "
+          f"p99={percentile(latencies, 99) * 1000:8.2f}ms")
+    print(f"other  p50={percentile(probes, 50) * 1000:8.2f}ms p99={percentile(probes, 99) * 1000:8.2f}ms "
+          f"({len(probes)} requests during the run)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mode', choices=['pool', 'inline', 'plaintext'], default='pool')
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--scrypt-n', type=int, default=2 ** 14)
+    parser.add_argument('--workers', type=int, default=0, help="KDF threads (default: CPU count)")
+    asyncio.run(run(parser.parse_args()))
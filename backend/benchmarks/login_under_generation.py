@@ -0,0 +1,77 @@
+"""Load test: /api/login latency while slow question generations are in flight.
+
+Runs the FastAPI app in-process with a stub model that blocks for
+--llm-latency seconds per call, like a synchronous Gemini request would, and
+compares login p50/p99 with and without concurrent generations.
+
+    python benchmarks/login_under_generation.py --generations 8 --logins 500
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from asgi_client import call, percentile, timed_call
+
+
+class SlowModel:
+    """Blocking stand-in for genai.GenerativeModel."""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def generate_content(self, prompt):
+        time.sleep(self.latency)
+        return type('Response', (), {'text': '["Question one?", "Question two?"]'})()
+
+
+async def measure_logins(app, count, concurrency):
+    body = {'email': 'bench@example.com', 'password': 'bench-password'}
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            status, seconds = await timed_call(app, 'POST', '/api/login', body)
+            assert status == 200, status
+            latencies.append(seconds)
+
+    await asyncio.gather(*(one() for _ in range(count)))
+    return latencies
+
+
+async def run(args):
+    import main
+    from user_store import UserStore
+
+    main.user_store = UserStore(os.path.join(tempfile.mkdtemp(), 'users.db'), legacy_json_path=None)
+    main.user_store.add({'email': 'bench@example.com', 'password': 'bench-password', 'name': 'Bench', 'role': 'seeker'})
+    for provider in main.llm_client.providers:
+        provider.client._model_factory = lambda: SlowModel(args.llm_latency)
+
+    idle = await measure_logins(main.app, args.logins, args.concurrency)
+
+    generations = [
+        asyncio.ensure_future(call(main.app, 'POST', '/api/generate-questions', {
+            'job_id': str(i), 'num_questions': 2, 'question_types': ['technical'],
+            'job_title': f'Job {i}', 'job_description': 'Benchmark job', 'required_skills': ['Python'],
+        }))
+        for i in range(args.generations)
+    ]
+    await asyncio.sleep(0.05)
+    busy = await measure_logins(main.app, args.logins, args.concurrency)
+    await asyncio.gather(*generations)
+
+    for label, samples in (('idle', idle), (f'{args.generations} generations in flight', busy)):
+        print(f"login {label:<28} p50={percentile(samples, 50) * 1000:8.2f}ms "
+              f"p99={percentile(samples, 99) * 1000:8.2f}ms max={max(samples) * 1000:8.2f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--logins', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--generations', type=int, default=8)
+    parser.add_argument('--llm-latency', type=float, default=2.0)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,101 @@
+"""Micro-benchmark: post-processing of raw model output into a question list.
+
+Times the original list-pass pipeline from generate_questions against
+questions.parse_questions + QuestionCollector with each duplicate detector,
+over the recorded outputs in fixtures/raw_outputs.json plus a synthetic
+answer with --large questions and near-duplicates.
+
+    python benchmarks/postprocess.py --large 500
+"""
+import argparse
+import json
+import os
+import random
+import timeit
+
+from asgi_client import BACKEND_DIR  # noqa: F401  (puts the backend on sys.path)
+from questions import DETECTORS, QuestionCollector, parse_questions
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'raw_outputs.json')
+
+DEFAULTS = [
+    "Can you walk me through your professional background and what led you to apply for this position?",
+    "Tell me about your experience with Python used in this role.",
+    "How do you handle challenging situations in the workplace?",
+    "What interests you most about this position at Software Engineer?",
+    "Can you describe a project where you demonstrated leadership?",
+]
+
+
+def legacy_pipeline(questions_text, num_questions):
+    """The post-processing generate_questions used before the questions module."""
+    try:
+        cleaned_text = questions_text.replace('```json', '').replace('```', '').strip()
+        questions = json.loads(cleaned_text)
+        questions = [q.strip() for q in questions]
+        questions = [q.replace('[', '').replace(']', '').replace('{', '').replace('}', '') for q in questions]
+        questions = [q for q in questions if q and not q.isspace()]
+    except (json.JSONDecodeError, AttributeError, TypeError):
+        questions = [q.strip() for q in questions_text.split('\n') if q.strip()]
+        questions = [q.lstrip('1234567890.- ').strip() for q in questions]
+        questions = [q.replace('[', '').replace(']', '').replace('{', '').replace('}', '') for q in questions]
+        questions = [q for q in questions if q and not q.isspace()]
+    questions = list(dict.fromkeys(questions))
+    if len(questions) > num_questions:
+        questions = questions[:num_questions]
+    elif len(questions) < num_questions:
+        defaults = [q for q in DEFAULTS if not any(
+            q.lower() in existing.lower() or existing.lower() in q.lower() for existing in questions
+        )]
+        questions.extend(defaults[:num_questions - len(questions)])
+    return questions
+
+
+def new_pipeline(questions_text, num_questions, detector):
+    collector = QuestionCollector(num_questions, DEFAULTS, detector)
+    collector.extend(parse_questions(questions_text))
+    collector.pad()
+    return collector.questions
+
+
+def large_output(count, seed=0):
+    rng = random.Random(seed)
+    topics = ['Python', 'SQL', 'React', 'testing', 'deadlines', 'code review', 'on-call', 'mentoring', 'APIs', 'caching']
+    templates = [
+        "Tell me about a time you used {} under pressure.",
+        "How would you explain {} to a new team member?",
+        "What is the hardest problem you solved with {}?",
+        "Describe how you would improve our approach to {}.",
+    ]
+    questions = []
+    for i in range(count):
+        question = rng.choice(templates).format(f"{rng.choice(topics)} #{i // 3}")
+        if rng.random() < 0.2 and questions:
+            # Near-duplicate: same question with different case or punctuation
+            question = rng.choice(questions).lower().rstrip('?') + ' ?'
+        questions.append(question)
+    return "```json\n" + json.dumps(questions) + "\n```"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--large', type=int, default=500, help="questions in the synthetic answer")
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    with open(FIXTURES) as f:
+        samples = [(o['name'], o['text'], 5) for o in json.load(f)]
+    samples.append((f'synthetic_{args.large}', large_output(args.large), args.large))
+
+    pipelines = [('legacy', lambda text, n: legacy_pipeline(text, n))]
+    pipelines += [(name, lambda text, n, name=name: new_pipeline(text, n, name)) for name in DETECTORS]
+
+    print(f"{'sample':<28}" + ''.join(f"{name:>14}" for name, _ in pipelines) + "   (us/call)")
+    for sample, text, num_questions in samples:
+        row = f"{sample:<28}"
+        for _, pipeline in pipelines:
+            repeat = args.repeat if num_questions <= 5 else max(1, args.repeat // 20)
+            seconds = timeit.timeit(lambda: pipeline(text, num_questions), number=repeat) / repeat
+            row += f"{seconds * 1e6:>14.1f}"
+        kept = {name: len(pipeline(text, num_questions)) for name, pipeline in pipelines}
+        print(row + "   kept " + ' '.join(f"{name}={n}" for name, n in kept.items()))
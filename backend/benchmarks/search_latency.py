@@ -0,0 +1,90 @@
+"""Search latency: the BM25 inverted index against a linear scan over the same jobs.
+
+Builds a SearchIndex over --docs synthetic jobs and times a mix of queries
+(exact words, multi-word, search-as-you-type prefixes and typos), then the
+same queries as a naive scan that lower-cases every job and counts the
+query words it contains. Also times re-indexing after --changes job edits.
+
+    python benchmarks/search_latency.py --docs 1000000
+"""
+import argparse
+import time
+
+from asgi_client import percentile
+from datasets import make_jobs
+
+from search import JOB_FIELDS, SearchIndex
+
+QUERIES = [
+    'python', 'data scientist', 'kubernetes docker aws', 'machine learning engineer berlin',
+    'pyth', 'data sci', 'devops eng', 'kubernets', 'pyhton sql', 'typescirpt react',
+]
+
+
+def linear_scan(jobs, query, k):
+    words = query.lower().split()
+    scored = []
+    for job in jobs:
+        text = ' '.join(str(job.get(field) or '') for field in JOB_FIELDS).lower()
+        score = sum(1 for word in words if word in text)
+        if score:
+            scored.append((score, job['id']))
+    scored.sort(key=lambda item: -item[0])
+    return scored[:k]
+
+
+def vm_hwm_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def main(args):
+    jobs = make_jobs(args.docs, args.seed)
+    before = vm_hwm_mb()
+    index = SearchIndex()
+    start = time.perf_counter()
+    index.sync_jobs(jobs)
+    # Fold the pending posting lists into numpy arrays, as the first queries would
+    for query in QUERIES:
+        index.search_jobs(query, args.k)
+    build = time.perf_counter() - start
+    print(f"indexed {args.docs} jobs in {build:.1f}s, peak RSS +{vm_hwm_mb() - before:.0f}MB, {index.index_stats()}")
+
+    print(f"{'query':<34}{'p50 ms':>9}{'p99 ms':>9}{'scan ms':>10}{'hits':>6}")
+    totals = []
+    for i, query in enumerate(QUERIES):
+        latencies = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            results = index.search_jobs(query, args.k)
+            latencies.append(time.perf_counter() - start)
+        totals += latencies
+        scan = ''
+        if i < args.scan_queries:
+            start = time.perf_counter()
+            linear_scan(jobs, query, args.k)
+            scan = f"{(time.perf_counter() - start) * 1000:.0f}"
+        print(f"{query:<34}{percentile(latencies, 50) * 1000:>9.2f}{percentile(latencies, 99) * 1000:>9.2f}"
+              f"{scan:>10}{len(results):>6}")
+    print(f"{'all queries':<34}{percentile(totals, 50) * 1000:>9.2f}{percentile(totals, 99) * 1000:>9.2f}")
+
+    for job in jobs[:args.changes]:
+        job['title'] = 'Staff ' + job['title']
+    start = time.perf_counter()
+    changed = index.sync_jobs(jobs)
+    print(f"re-indexed {changed} changed jobs in {(time.perf_counter() - start) * 1000:.0f}ms "
+          f"(fingerprints all {args.docs})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--docs', type=int, default=1000000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--scan-queries', type=int, default=3, help="queries also run as a linear scan")
+    parser.add_argument('--changes', type=int, default=100)
+    main(parser.parse_args())
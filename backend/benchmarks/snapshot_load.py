@@ -0,0 +1,84 @@
+"""Benchmark: loading users/jobs from pretty-printed JSON vs a columnar snapshot.
+
+For each --records size, writes synthetic user records both as indent=4 JSON
+(what users.json and jobs.json use) and as a snapshot.py file, then in a fresh
+process per format measures the time to load them and index them by email,
+the peak RSS it took (Linux only), and the time for --lookups random record reads.
+
+    python benchmarks/snapshot_load.py --records 100000 1000000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from asgi_client import BACKEND_DIR
+from datasets import make_users
+from snapshot import write_snapshot
+
+CHILD = """
+import json, random, sys, time
+sys.path.insert(0, %(backend)r)
+from snapshot import Snapshot
+
+def peak_rss_mb():
+    # VmHWM starts over at exec, unlike ru_maxrss which inherits the parent's peak
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+
+fmt, path, lookups = sys.argv[1], sys.argv[2], int(sys.argv[3])
+base = peak_rss_mb()
+start = time.perf_counter()
+if fmt == 'json':
+    with open(path) as f:
+        records = json.load(f)
+    by_email = {record['email']: record for record in records}
+else:
+    records = Snapshot(path)
+    by_email = {email: row for row, email in enumerate(records.column('email'))}
+loaded = time.perf_counter() - start
+peak = peak_rss_mb()
+
+emails = random.Random(0).sample(list(by_email), min(lookups, len(by_email)))
+start = time.perf_counter()
+for email in emails:
+    record = by_email[email] if fmt == 'json' else records[by_email[email]]
+    record.get('name'), record.get('skills')
+looked_up = time.perf_counter() - start
+print(loaded, peak - base, looked_up / max(1, len(emails)))
+"""
+
+def measure(fmt, path, lookups):
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD % {'backend': BACKEND_DIR}, fmt, path, str(lookups)],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return [float(x) for x in output.split()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--lookups', type=int, default=10000)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    print(f"{'records':>9} {'format':<9} {'file MB':>8} {'load s':>8} {'peak RSS MB':>12} {'lookup us':>10}")
+    for count in args.records:
+        users = make_users(count)
+        json_path = os.path.join(directory, f'users-{count}.json')
+        snapshot_path = os.path.join(directory, f'users-{count}.snap')
+        with open(json_path, 'w') as f:
+            json.dump(users, f, indent=4)
+        write_snapshot(snapshot_path, users)
+        del users
+        for fmt, path in (('json', json_path), ('snapshot', snapshot_path)):
+            loaded, rss, lookup = measure(fmt, path, args.lookups)
+            print(f"{count:>9} {fmt:<9} {os.path.getsize(path) / 2 ** 20:>8.1f} {loaded:>8.3f} "
+                  f"{rss:>12.1f} {lookup * 1e6:>10.2f}")
+        os.unlink(json_path)
+        os.unlink(snapshot_path)
@@ -0,0 +1,48 @@
+"""Startup benchmark: time from a fresh interpreter to the app serving its first request.
+
+Each run starts a new Python process, imports main and sends one in-process
+request, so module import, storage setup and any import-time network calls
+are all counted.
+
+    python benchmarks/startup.py --runs 10
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+from asgi_client import BACKEND_DIR
+
+CHILD = """
+import asyncio, sys, time
+start = time.perf_counter()
+sys.path.insert(0, 'benchmarks')
+import main
+imported = time.perf_counter()
+from asgi_client import call
+status, _, _ = asyncio.run(call(main.app, 'GET', '/api/stats/llm'))
+assert status == 200, status
+print(imported - start, time.perf_counter() - start)
+"""
+
+
+def run_once():
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD], cwd=BACKEND_DIR, check=True, capture_output=True, text=True
+    ).stdout
+    imported, ready = (float(x) for x in output.strip().splitlines()[-1].split())
+    return imported, ready
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    # Warm the OS file cache so the first run isn't an outlier
+    run_once()
+    results = [run_once() for _ in range(args.runs)]
+    for label, samples in (('import', [r[0] for r in results]), ('ready', [r[1] for r in results])):
+        print(f"{label:<7} median={statistics.median(samples) * 1000:8.1f}ms "
+              f"min={min(samples) * 1000:8.1f}ms max={max(samples) * 1000:8.1f}ms")
+    print(f"({args.runs} runs, python {sys.version.split()[0]})")
@@ -0,0 +1,132 @@
+"""Local stand-in for genai.GenerativeModel with configurable latency and bad output.
+
+StubModel answers question prompts with a JSON array (or, for batch
+prompts, a JSON object keyed by job id) after `latency` seconds, plus up to
+`jitter` more. A `malformed_rate` fraction of answers come back in one of
+the broken shapes real models produce: a fenced or chatty array, a
+numbered list, a truncated array, or an object instead of an array. A
+`stall_rate` fraction of calls take `stall` seconds longer, and an
+`error_rate` fraction raise StubModelError. It supports blocking, async and
+streaming calls, and reports usage metadata.
+"""
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+
+_QUESTION_COUNT = re.compile(r'[Gg]enerate (\d+)|[Ww]rite (\d+)')
+_JOB_ID = re.compile(r'Job ID: (\S+)')
+
+MALFORMED_SHAPES = ('fenced', 'chatter', 'numbered', 'truncated', 'object')
+
+
+class StubModelError(Exception):
+    """Raised for the error_rate fraction of calls."""
+
+
+class _Usage:
+    def __init__(self, prompt, text):
+        # Roughly four characters per token
+        self.prompt_token_count = len(prompt) // 4
+        self.candidates_token_count = len(text) // 4
+
+
+class _Response:
+    def __init__(self, text, usage=None):
+        self.text = text
+        self.usage_metadata = usage
+
+
+class _Stream:
+    """Async iterator over response chunks, each arriving after a share of the latency."""
+
+    def __init__(self, chunks, delay, usage):
+        self._chunks = list(chunks)
+        self._delay = delay
+        self._usage = usage
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._chunks:
+            raise StopAsyncIteration
+        await asyncio.sleep(self._delay)
+        text = self._chunks.pop(0)
+        return _Response(text, self._usage if not self._chunks else None)
+
+
+class StubModel:
+    def __init__(self, latency=0.5, jitter=0.0, malformed_rate=0.0, seed=0, chunk_size=40,
+                 stall_rate=0.0, stall=0.0, error_rate=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.malformed_rate = malformed_rate
+        self.stall_rate = stall_rate
+        self.stall = stall
+        self.error_rate = error_rate
+        self.chunk_size = chunk_size
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _delay(self):
+        with self._lock:
+            stall = self.stall if self._rng.random() < self.stall_rate else 0.0
+            return self.latency + self._rng.random() * self.jitter + stall
+
+    def _maybe_fail(self):
+        with self._lock:
+            failed = self._rng.random() < self.error_rate
+        if failed:
+            raise StubModelError("stub model error")
+
+    def _answer(self, prompt):
+        with self._lock:
+            self.calls += 1
+            malformed = self._rng.random() < self.malformed_rate
+            shape = self._rng.choice(MALFORMED_SHAPES)
+        match = _QUESTION_COUNT.search(prompt)
+        count = int(next(g for g in match.groups() if g)) if match else 5
+        job_ids = _JOB_ID.findall(prompt)
+        if len(job_ids) > 1:
+            # Batch prompt: one array per job id
+            return json.dumps({job_id: self._questions(job_id, count) for job_id in job_ids})
+        questions = self._questions(job_ids[0] if job_ids else 'job', count)
+        if not malformed:
+            return json.dumps(questions)
+        if shape == 'fenced':
+            return "```json\n" + json.dumps(questions, indent=2) + "\n```"
+        if shape == 'chatter':
+            return "Sure! Here are the interview questions:\n\n" + json.dumps(questions) + "\n\nGood luck!"
+        if shape == 'numbered':
+            return '\n'.join(f"{i}. {q}" for i, q in enumerate(questions, 1))
+        if shape == 'truncated':
+            text = json.dumps(questions)
+            return text[:len(text) * 2 // 3]
+        return json.dumps({'questions': questions})
+
+    @staticmethod
+    def _questions(job_id, count):
+        return [f"Stub question {i + 1} for job {job_id}: how would you approach topic {i + 1}?" for i in range(count)]
+
+    def generate_content(self, prompt, stream=False):
+        text = self._answer(prompt)
+        time.sleep(self._delay())
+        self._maybe_fail()
+        response = _Response(text, _Usage(prompt, text))
+        return iter([response]) if stream else response
+
+    async def generate_content_async(self, prompt, stream=False):
+        text = self._answer(prompt)
+        delay = self._delay()
+        usage = _Usage(prompt, text)
+        if stream:
+            self._maybe_fail()
+            chunks = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)] or ['']
+            return _Stream(chunks, delay / len(chunks), usage)
+        await asyncio.sleep(delay)
+        self._maybe_fail()
+        return _Response(text, usage)
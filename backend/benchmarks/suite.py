@@ -0,0 +1,279 @@
+"""Benchmark suite: throughput and p50/p95/p99 latency per endpoint, compared against a baseline.
+
+Builds a synthetic dataset (benchmarks/datasets.py), points the app at it,
+replaces Gemini with benchmarks/stub_model.py, and sends --requests requests
+at --concurrency to each of:
+
+    signup              POST /api/signup with new seekers
+    login               POST /api/login for random existing users
+    job_detail          GET /api/jobs/{job_id} for random jobs
+    generate_questions  POST /api/generate-questions for distinct jobs (cache misses)
+
+--driver asgi calls the app in-process; --driver uvicorn serves it from a
+uvicorn subprocess and sends real HTTP requests over keep-alive connections.
+Results are compared with the baseline stored for the same driver, if there
+is one, and --save-baseline replaces it. --check exits with status 1 when an
+endpoint's p95 or throughput is more than --tolerance worse than the baseline.
+
+    python benchmarks/suite.py --users 10000 --jobs 1000 --save-baseline
+    python benchmarks/suite.py --users 10000 --jobs 1000 --check
+    python benchmarks/suite.py --driver uvicorn --users 1000000 --jobs 100000 --data /tmp/bench-1m
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import platform
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgi_client import BACKEND_DIR, call, percentile
+from datasets import PASSWORD, write_dataset
+
+BASELINE_DIR = os.path.join(BACKEND_DIR, 'benchmarks', 'baselines')
+ENDPOINTS = ('signup', 'login', 'job_detail', 'generate_questions')
+
+
+def prepare_data(args):
+    """Returns (users_db, jobs_file), generating the dataset unless --data already holds it."""
+    directory = args.data or tempfile.mkdtemp(prefix='bench-data-')
+    users_db = os.path.join(directory, 'users.db')
+    jobs_file = os.path.join(directory, 'jobs.json')
+    if not (os.path.exists(users_db) and os.path.exists(jobs_file)):
+        from passwords import PasswordHasher
+        start = time.perf_counter()
+        write_dataset(directory, args.users, args.jobs, args.seed, PasswordHasher(n=args.scrypt_n).hash(PASSWORD))
+        print(f"generated {args.users} users and {args.jobs} jobs in {directory} ({time.perf_counter() - start:.1f}s)")
+    return users_db, jobs_file
+
+
+def install(args, users_db, jobs_file):
+    """Imports main and points it at the dataset and the stub model."""
+    import main
+    from job_catalog import JobCatalog
+    from json_store import JsonFileStore
+    from llm_cache import ResponseCache
+    from passwords import PasswordHasher
+    from stub_model import StubModel
+    from user_store import UserStore
+
+    main.user_store = UserStore(users_db, legacy_json_path=None)
+    main.user_store.add_listener(main.skill_matcher.add_seeker)
+    main.jobs_file = JsonFileStore(jobs_file)
+    main.job_catalog = JobCatalog(jobs_file, lambda: main.jobs_file.read(default=[]))
+    main.password_hasher = PasswordHasher(n=args.scrypt_n)
+    main.question_cache = ResponseCache(max_entries=1024, ttl=3600)
+    stub = StubModel(latency=args.llm_latency, jitter=args.llm_jitter, malformed_rate=args.malformed_rate, seed=args.seed)
+    for provider in main.llm_client.providers:
+        provider.client._model_factory = lambda: stub
+    return main
+
+
+def build_requests(endpoint, args, users_db, jobs_file, rng):
+    """Returns the (method, path, body) list for one endpoint."""
+    n = args.requests
+    if endpoint == 'signup':
+        run = f'{int(time.time())}-{rng.randrange(10 ** 6)}'
+        return [('POST', '/api/signup', {
+            'role': 'seeker', 'name': f'New {i}', 'email': f'new-{run}-{i}@example.com',
+            'password': PASSWORD, 're_password': PASSWORD, 'phone': '555-0000000',
+            'job_title': 'Software Engineer', 'experience': '3 years', 'skills': ['Python', 'SQL'],
+            'location': 'Remote', 'resume_url': 'https://example.com/resume.pdf',
+        }) for i in range(n)]
+    if endpoint == 'login':
+        conn = sqlite3.connect(users_db)
+        emails = [row[0] for row in conn.execute("SELECT email FROM users ORDER BY random() LIMIT ?", (min(n, 1000),))]
+        conn.close()
+        return [('POST', '/api/login', {'email': rng.choice(emails), 'password': PASSWORD}) for _ in range(n)]
+
+    with open(jobs_file) as f:
+        jobs = json.load(f)
+    if endpoint == 'job_detail':
+        return [('GET', f"/api/jobs/{rng.choice(jobs)['id']}", None) for _ in range(n)]
+    picked = rng.sample(jobs, n) if n <= len(jobs) else [rng.choice(jobs) for _ in range(n)]
+    return [('POST', '/api/generate-questions', {
+        'job_id': job['id'], 'num_questions': 5, 'question_types': ['technical', 'behavioral'],
+        'job_title': job['title'], 'job_description': job['description'], 'required_skills': job['required_skills'],
+    }) for job in picked]
+
+
+async def drive_asgi(app, requests, concurrency):
+    latencies, errors = [], 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(method, path, body):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            status, _, _ = await call(app, method, path, body)
+            latencies.append(time.perf_counter() - start)
+            if status >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(*request) for request in requests))
+    return latencies, errors, time.perf_counter() - start
+
+
+def drive_http(port, requests, concurrency):
+    local = threading.local()
+    lock = threading.Lock()
+    latencies, errors = [], [0]
+
+    def one(request):
+        method, path, body = request
+        if not hasattr(local, 'conn'):
+            local.conn = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+        payload = json.dumps(body) if body is not None else None
+        start = time.perf_counter()
+        local.conn.request(method, path, body=payload, headers={'Content-Type': 'application/json'})
+        response = local.conn.getresponse()
+        response.read()
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            if response.status >= 400:
+                errors[0] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, requests))
+    return latencies, errors[0], time.perf_counter() - start
+
+
+def start_server(args, port):
+    command = [sys.executable, os.path.abspath(__file__), '--serve', '--port', str(port), '--data', args.data]
+    for name in ('users', 'jobs', 'seed', 'scrypt_n', 'llm_latency', 'llm_jitter', 'malformed_rate'):
+        command += ['--' + name.replace('_', '-'), str(getattr(args, name))]
+    server = subprocess.Popen(command, cwd=BACKEND_DIR)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/api/stats/llm')
+            if conn.getresponse().status == 200:
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("uvicorn did not start")
+
+
+def serve(args):
+    import uvicorn
+
+    main = install(args, *prepare_data(args))
+    uvicorn.run(main.app, host='127.0.0.1', port=args.port, log_level='warning')
+
+
+def summarize(latencies, errors, elapsed):
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput': round(len(latencies) / elapsed, 2),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Prints each endpoint against the baseline and returns the endpoints that regressed."""
+    regressions = []
+    print(f"\nvs baseline from {baseline['meta'].get('created', '?')} (tolerance {tolerance:.0%})")
+    for endpoint, result in results.items():
+        base = baseline['results'].get(endpoint)
+        if base is None:
+            continue
+        throughput = result['throughput'] / base['throughput'] - 1 if base['throughput'] else 0.0
+        p95 = result['p95_ms'] / base['p95_ms'] - 1 if base['p95_ms'] else 0.0
+        regressed = throughput < -tolerance or p95 > tolerance
+        if regressed:
+            regressions.append(endpoint)
+        print(f"{endpoint:<20} throughput {throughput:+7.1%}   p95 {p95:+7.1%}   {'REGRESSED' if regressed else 'ok'}")
+    return regressions
+
+
+def run(args):
+    users_db, jobs_file = prepare_data(args)
+    args.data = os.path.dirname(users_db)
+    rng = random.Random(args.seed)
+    plans = {endpoint: build_requests(endpoint, args, users_db, jobs_file, rng) for endpoint in args.endpoints}
+
+    results = {}
+    if args.driver == 'asgi':
+        main = install(args, users_db, jobs_file)
+
+        async def run_all():
+            # One event loop for every endpoint, like a server process
+            for endpoint, requests in plans.items():
+                results[endpoint] = summarize(*await drive_asgi(main.app, requests, args.concurrency))
+
+        asyncio.run(run_all())
+    else:
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            port = s.getsockname()[1]
+        server = start_server(args, port)
+        try:
+            for endpoint, requests in plans.items():
+                results[endpoint] = summarize(*drive_http(port, requests, args.concurrency))
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(f"\n{'endpoint':<20} {'reqs':>6} {'errors':>6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for endpoint, r in results.items():
+        print(f"{endpoint:<20} {r['requests']:>6} {r['errors']:>6} {r['throughput']:>9.1f} "
+              f"{r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f}")
+
+    baseline_path = args.baseline or os.path.join(BASELINE_DIR, f'{args.driver}.json')
+    regressions = []
+    if os.path.exists(baseline_path):
+        with open(baseline_path) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(baseline_path), exist_ok=True)
+        meta = {key: getattr(args, key) for key in (
+            'driver', 'users', 'jobs', 'requests', 'concurrency', 'scrypt_n', 'llm_latency', 'malformed_rate', 'seed'
+        )}
+        meta.update(created=time.strftime('%Y-%m-%d %H:%M:%S'), python=platform.python_version(), machine=platform.node())
+        with open(baseline_path, 'w') as f:
+            json.dump({'meta': meta, 'results': results}, f, indent=4)
+        print(f"\nsaved baseline to {baseline_path}")
+    return 1 if args.check and regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--driver', choices=['asgi', 'uvicorn'], default='asgi')
+    parser.add_argument('--endpoints', nargs='+', choices=ENDPOINTS, default=list(ENDPOINTS))
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--jobs', type=int, default=1000)
+    parser.add_argument('--data', help="dataset directory, generated on first use and reused after")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--requests', type=int, default=200, help="requests per endpoint")
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--scrypt-n', type=int, default=2 ** 14)
+    parser.add_argument('--llm-latency', type=float, default=0.5)
+    parser.add_argument('--llm-jitter', type=float, default=0.2)
+    parser.add_argument('--malformed-rate', type=float, default=0.1)
+    parser.add_argument('--baseline', help="baseline file (default: benchmarks/baselines/<driver>.json)")
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.15)
+    parser.add_argument('--check', action='store_true', help="exit with status 1 on a regression")
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, default=8000, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args)
+    else:
+        sys.exit(run(args))
@@ -0,0 +1,162 @@
+import base64
+import binascii
+import hashlib
+import logging
+import os
+import threading
+from bisect import bisect_left
+
+import metrics
+
+# Fields that get an exact-match (case-insensitive) index
+INDEXED_FIELDS = ('company', 'location', 'job_type')
+
+logger = logging.getLogger(__name__)
+
+
+def _key(value):
+    return str(value).strip().lower()
+
+
+def encode_cursor(job_id):
+    return base64.urlsafe_b64encode(str(job_id).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    try:
+        return base64.urlsafe_b64decode(padded.encode()).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        raise ValueError("Invalid cursor.")
+
+
+class JobCatalog:
+    """In-memory job catalog indexed by id, company, location, job_type and skill.
+
+    The jobs file is parsed once and reloaded only when its mtime or size
+    changes. Every index maps a lower-cased value to the sorted list of catalog
+    positions holding it, so a filtered page is found by walking the shortest
+    posting list and binary-searching the others.
+
+    load may return any sequence of job mappings, such as a memory-mapped
+    snapshot.Snapshot whose records decode only the fields that are read.
+    """
+
+    def __init__(self, path, load):
+        self.path = path
+        self._load = load
+        self._lock = threading.Lock()
+        self._signature = None
+        self._listeners = []
+        self.version = None
+        self.jobs = []
+        self._by_id = {}
+        self._postings = {}
+
+    def add_listener(self, callback):
+        """Registers callback(catalog) to be called after every reload."""
+        self._listeners.append(callback)
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def refresh(self):
+        """Reloads and re-indexes the catalog if the jobs file changed."""
+        signature = self._stat()
+        if signature is not None and signature == self._signature:
+            return False
+        with self._lock:
+            signature = self._stat()
+            if signature is not None and signature == self._signature:
+                return False
+            try:
+                with metrics.stage('catalog_load'):
+                    jobs = self._load()
+            except Exception as e:
+                # Keep serving the last good catalog rather than an empty one; retried on the next refresh
+                logger.error("Error loading job catalog: %s", e, extra={'path': self.path})
+                return False
+            # The loader may have created the file (sample jobs)
+            signature = self._stat()
+            self._index(jobs)
+            self._signature = signature
+            self.version = '%d-%d' % signature if signature else '0-0'
+        for callback in self._listeners:
+            try:
+                callback(self)
+            except Exception as e:
+                logger.exception("Error in job catalog listener: %s", e)
+        return True
+
+    def _index(self, jobs):
+        by_id = {}
+        postings = {field: {} for field in INDEXED_FIELDS + ('skill',)}
+        for pos, job in enumerate(jobs):
+            by_id[str(job.get('id'))] = pos
+            for field in INDEXED_FIELDS:
+                value = job.get(field)
+                if value:
+                    postings[field].setdefault(_key(value), []).append(pos)
+            for skill in set(_key(s) for s in job.get('required_skills') or []):
+                postings['skill'].setdefault(skill, []).append(pos)
+        self.jobs = jobs
+        self._by_id = by_id
+        self._postings = postings
+
+    def get(self, job_id):
+        """Returns the job with the given id, or None."""
+        self.refresh()
+        pos = self._by_id.get(str(job_id))
+        return self.jobs[pos] if pos is not None else None
+
+    def etag(self, *parts):
+        """Builds an ETag from the catalog version and the query that produced the response."""
+        digest = hashlib.sha1('|'.join([self.version or ''] + [str(p) for p in parts]).encode()).hexdigest()
+        return f'"{digest[:20]}"'
+
+    def search(self, filters=None, cursor=None, limit=20):
+        """Returns (jobs, next_cursor) for jobs matching every (field, value) in filters.
+
+        filters maps a field name (company, location, job_type or skill) to a
+        list of values; all of them must match. cursor is the opaque value
+        returned as next_cursor by the previous page.
+        """
+        self.refresh()
+        jobs, by_id, postings = self.jobs, self._by_id, self._postings
+
+        start = 0
+        if cursor:
+            pos = by_id.get(decode_cursor(cursor))
+            if pos is None:
+                raise ValueError("Invalid cursor.")
+            start = pos + 1
+
+        lists = []
+        for field, values in (filters or {}).items():
+            for value in values:
+                lists.append(postings[field].get(_key(value), []))
+
+        if not lists:
+            page = list(range(start, min(start + limit + 1, len(jobs))))
+        else:
+            lists.sort(key=len)
+            driver, others = lists[0], lists[1:]
+            page = []
+            for i in range(bisect_left(driver, start), len(driver)):
+                pos = driver[i]
+                if all(_contains(other, pos) for other in others):
+                    page.append(pos)
+                    if len(page) > limit:
+                        break
+
+        next_cursor = encode_cursor(jobs[page[limit - 1]]['id']) if len(page) > limit else None
+        return [jobs[pos] for pos in page[:limit]], next_cursor
+
+
+def _contains(sorted_list, value):
+    i = bisect_left(sorted_list, value)
+    return i < len(sorted_list) and sorted_list[i] == value
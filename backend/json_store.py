@@ -0,0 +1,169 @@
+import json
+import os
+import tempfile
+import threading
+
+import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are only serialized within one process
+    fcntl = None
+
+
+class CorruptFileError(Exception):
+    """Raised when a JSON file exists but can't be parsed, instead of treating it as empty."""
+
+
+class _PendingUpdate:
+    __slots__ = ('mutate', 'done', 'result', 'error')
+
+    def __init__(self, mutate):
+        self.mutate = mutate
+        self.done = False
+        self.result = None
+        self.error = None
+
+
+class JsonFileStore:
+    """A JSON list on disk, safe for concurrent writers and crashes.
+
+    Every write goes to a temp file in the same directory, is fsynced, and
+    replaces the file with os.replace, so readers and a crash only ever see the
+    old or the new version. Writers hold an exclusive flock on a sidecar
+    "<path>.lock" file, so read-modify-write cycles from several processes
+    (uvicorn workers, scripts) never interleave.
+
+    update() calls from threads of one process are group-committed: while one
+    thread writes, others queue their changes, and the next writer applies all
+    of them to one read of the file and commits them with a single fsync.
+    """
+
+    def __init__(self, path, indent=4):
+        self.path = path
+        self.indent = indent
+        self._lock_path = path + '.lock'
+        self._queue_lock = threading.Lock()
+        self._commit_lock = threading.Lock()
+        self._pending = []
+        self.stats = {'updates': 0, 'commits': 0}
+
+    def read(self, default=None):
+        """Returns the parsed file, or default if it doesn't exist. Raises CorruptFileError if it can't be parsed."""
+        try:
+            with metrics.stage('file_read'), open(self.path, 'r') as f:
+                content = f.read()
+        except FileNotFoundError:
+            return default
+        if not content.strip():
+            return default
+        try:
+            with metrics.stage('json_parse'):
+                return json.loads(content)
+        except json.JSONDecodeError as e:
+            raise CorruptFileError(f"{self.path} is not valid JSON: {e}") from e
+
+    def write(self, items):
+        """Replaces the file contents with items."""
+        def replace(current):
+            current[:] = items
+        self.update(replace)
+
+    def create(self, items):
+        """Writes items only if the file doesn't exist yet. Returns True if it was created."""
+        with self._file_lock():
+            if os.path.exists(self.path):
+                return False
+            self._write(items)
+            return True
+
+    def update(self, mutate):
+        """Runs mutate(items) on the current list and commits the result.
+
+        Returns what mutate returns. If mutate raises, its exception is re-raised
+        here; mutate should raise before changing items, since changes made by
+        the other updates in the same commit are written either way.
+        """
+        op = _PendingUpdate(mutate)
+        with self._queue_lock:
+            self._pending.append(op)
+        with self._commit_lock:
+            if not op.done:
+                with self._queue_lock:
+                    batch, self._pending = self._pending, []
+                self._commit(batch)
+        if op.error is not None:
+            raise op.error
+        return op.result
+
+    def _commit(self, batch):
+        try:
+            with self._file_lock():
+                items = self.read(default=[])
+                changed = False
+                for op in batch:
+                    try:
+                        op.result = op.mutate(items)
+                        changed = True
+                    except Exception as e:
+                        op.error = e
+                if changed:
+                    self._write(items)
+                    self.stats['commits'] += 1
+        except Exception as e:
+            for op in batch:
+                if op.error is None:
+                    op.error = e
+        finally:
+            self.stats['updates'] += len(batch)
+            for op in batch:
+                op.done = True
+
+    def _write(self, items):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(self.path) + '-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(items, f, indent=self.indent)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        if hasattr(os, 'O_DIRECTORY'):
+            # Make the rename itself durable
+            dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
+    def _file_lock(self):
+        return _FileLock(self._lock_path)
+
+    def store_stats(self):
+        return dict(self.stats)
+
+
+class _FileLock:
+    """Exclusive flock on a sidecar file; the data file itself is replaced on every write."""
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    def __enter__(self):
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
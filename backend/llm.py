@@ -0,0 +1,313 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Local cache of the model list returned by genai.list_models()
+MODELS_CACHE_FILE = os.path.join(os.path.dirname(__file__), '.gemini_models.json')
+
+
+class LLMBusyError(Exception):
+    """Raised when the LLM request queue is full."""
+
+
+class ClientDisconnected(Exception):
+    """Raised when the HTTP client went away while its LLM call was pending."""
+
+
+class GeminiModelFactory:
+    """Builds the Gemini model on first use instead of at import time.
+
+    The SDK import, genai.configure and model discovery all happen on the first
+    call, and model discovery is cached in a local file for models_ttl seconds
+    so restarts don't repeat the list_models network round trip.
+
+    system_instruction, when given, is attached to the model once so the
+    instructions shared by every prompt are not resent in each prompt body.
+    """
+
+    def __init__(self, model_name, api_key=None, models_cache_file=MODELS_CACHE_FILE, models_ttl=24 * 3600,
+                 system_instruction=None):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self.api_key = api_key
+        self.models_cache_file = models_cache_file
+        self.models_ttl = models_ttl
+        self._lock = threading.Lock()
+        self._genai = None
+
+    def _sdk(self):
+        if self._genai is None:
+            import google.generativeai as genai
+            genai.configure(api_key=self.api_key)
+            self._genai = genai
+        return self._genai
+
+    def available_models(self):
+        """Returns the model names visible to the API key, from the local cache when fresh."""
+        try:
+            if time.time() - os.path.getmtime(self.models_cache_file) < self.models_ttl:
+                with open(self.models_cache_file, 'r') as f:
+                    return json.load(f)
+        except (OSError, ValueError):
+            pass
+        try:
+            models = [m.name for m in self._sdk().list_models()]
+        except Exception as e:
+            logger.error("Error listing Gemini models: %s", e)
+            return []
+        try:
+            with open(self.models_cache_file, 'w') as f:
+                json.dump(models, f)
+        except OSError as e:
+            logger.warning("Error caching Gemini model list: %s", e)
+        return models
+
+    def __call__(self):
+        with self._lock:
+            models = self.available_models()
+            if models and f"models/{self.model_name}" not in models:
+                logger.warning("%s is not in the available models", self.model_name, extra={'models': models})
+            if self.system_instruction:
+                return self._sdk().GenerativeModel(self.model_name, system_instruction=self.system_instruction)
+            return self._sdk().GenerativeModel(self.model_name)
+
+
+class _OllamaUsage:
+    def __init__(self, body):
+        self.prompt_token_count = body.get('prompt_eval_count', 0)
+        self.candidates_token_count = body.get('eval_count', 0)
+
+
+class _OllamaResponse:
+    def __init__(self, text, usage=None):
+        self.text = text
+        self.usage_metadata = usage
+
+
+class OllamaModel:
+    """A model served by a local Ollama daemon, with the generate_content API of the Gemini SDK.
+
+    Calls are blocking HTTP requests to /api/generate, so LLMClient runs them
+    on its thread pool. Streamed responses are read line by line.
+    """
+
+    def __init__(self, model_name='mistral', base_url='http://localhost:11434', system_instruction=None, timeout=60.0):
+        self.model_name = model_name
+        self.base_url = base_url.rstrip('/')
+        self.system_instruction = system_instruction
+        self.timeout = timeout
+
+    def _post(self, prompt, stream):
+        body = {'model': self.model_name, 'prompt': prompt, 'stream': stream}
+        if self.system_instruction:
+            body['system'] = self.system_instruction
+        request = urllib.request.Request(
+            self.base_url + '/api/generate',
+            data=json.dumps(body).encode('utf-8'),
+            headers={'Content-Type': 'application/json'},
+        )
+        return urllib.request.urlopen(request, timeout=self.timeout)
+
+    def generate_content(self, prompt, stream=False):
+        if stream:
+            return self._stream(prompt)
+        with self._post(prompt, False) as response:
+            body = json.load(response)
+        return _OllamaResponse(body.get('response', ''), _OllamaUsage(body))
+
+    def _stream(self, prompt):
+        with self._post(prompt, True) as response:
+            for line in response:
+                if not line.strip():
+                    continue
+                body = json.loads(line)
+                yield _OllamaResponse(body.get('response', ''), _OllamaUsage(body) if body.get('done') else None)
+
+
+class LLMClient:
+    """Runs model calls off the event loop with a timeout and a bounded queue.
+
+    At most `concurrency` calls run at once; up to `queue_size` more wait for a
+    slot and anything beyond that is rejected with LLMBusyError. Models with an
+    async API (generate_content_async) are awaited directly, others run on a
+    dedicated thread pool so a slow generation never blocks other requests.
+    The model is built once, on the thread pool, and reused for every call.
+    A blocking call that times out keeps its slot until its thread returns,
+    so abandoned calls cannot pile up behind the caller's back.
+    """
+
+    def __init__(self, model_factory, concurrency=8, queue_size=32, timeout=30.0):
+        self._model_factory = model_factory
+        self._model = None
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self._semaphore = None
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='llm')
+        self._waiting = 0
+        self._abandoned = 0
+        self.stats = {'calls': 0, 'rejected': 0, 'timeouts': 0, 'errors': 0, 'prompt_tokens': 0, 'response_tokens': 0}
+
+    async def _acquire(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        if self._semaphore.locked() and self._waiting >= self.queue_size:
+            self.stats['rejected'] += 1
+            raise LLMBusyError("Too many pending question generations, try again shortly.")
+
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+        self.stats['calls'] += 1
+
+    async def generate(self, prompt, timeout=None):
+        """Sends prompt to the model and returns the response text."""
+        await self._acquire()
+        work = []
+        try:
+            with metrics.stage('llm_call'):
+                response = await asyncio.wait_for(self._call(prompt, work), timeout or self.timeout)
+            self._count_tokens(response)
+            return response.text
+        except asyncio.TimeoutError:
+            self.stats['timeouts'] += 1
+            raise
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.stats['errors'] += 1
+            raise
+        finally:
+            self._release(work)
+
+    async def stream(self, prompt, timeout=None):
+        """Sends prompt to the model and yields the response text chunk by chunk.
+
+        The timeout applies to the whole response, not to each chunk.
+        """
+        await self._acquire()
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        deadline = start + (timeout or self.timeout)
+        chunk = None
+        work = []
+        try:
+            model = await asyncio.wait_for(self.model(), deadline - loop.time())
+            if hasattr(model, 'generate_content_async'):
+                response = await asyncio.wait_for(
+                    model.generate_content_async(prompt, stream=True), deadline - loop.time()
+                )
+                chunks = response.__aiter__()
+                next_chunk = chunks.__anext__
+            else:
+                response = await asyncio.wait_for(
+                    self._in_thread(work, lambda: iter(model.generate_content(prompt, stream=True))),
+                    deadline - loop.time(),
+                )
+                next_chunk = lambda: self._in_thread(work, _next_or_stop, response)
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(next_chunk(), deadline - loop.time())
+                except StopAsyncIteration:
+                    break
+                yield chunk.text
+            # Streamed responses report token usage on the last chunk
+            self._count_tokens(chunk)
+        except asyncio.TimeoutError:
+            self.stats['timeouts'] += 1
+            raise
+        except (asyncio.CancelledError, GeneratorExit):
+            raise
+        except Exception:
+            self.stats['errors'] += 1
+            raise
+        finally:
+            metrics.STAGE_SECONDS.observe(loop.time() - start, stage='llm_stream')
+            self._release(work)
+
+    def _in_thread(self, work, fn, *args):
+        """Runs fn on the pool, recording its future in work so _release can tell if it is still running."""
+        future = self._executor.submit(fn, *args)
+        work.append(future)
+        return asyncio.wrap_future(future)
+
+    def _release(self, work):
+        """Frees the call's slot, or, if it timed out with its thread still blocked in the model, once that thread returns.
+
+        A timeout only abandons the blocking call; until it finishes it still
+        occupies a pool thread, so it keeps counting against concurrency.
+        """
+        running = [future for future in work if not future.done()]
+        if not running:
+            self._semaphore.release()
+            return
+        self._abandoned += 1
+        loop = asyncio.get_running_loop()
+
+        def finished():
+            self._abandoned -= 1
+            self._semaphore.release()
+
+        running[-1].add_done_callback(lambda _: loop.call_soon_threadsafe(finished))
+
+    def _count_tokens(self, response):
+        usage = getattr(response, 'usage_metadata', None)
+        if usage is None:
+            return
+        for direction, field in (('prompt', 'prompt_token_count'), ('response', 'candidates_token_count')):
+            count = getattr(usage, field, 0) or 0
+            self.stats[direction + '_tokens'] += count
+            metrics.LLM_TOKENS.inc(count, direction=direction)
+
+    async def model(self):
+        """Returns the shared model instance, building it off the event loop on first use."""
+        if self._model is None:
+            loop = asyncio.get_running_loop()
+            model = await loop.run_in_executor(self._executor, self._model_factory)
+            if self._model is None:
+                self._model = model
+        return self._model
+
+    async def _call(self, prompt, work):
+        model = await self.model()
+        if hasattr(model, 'generate_content_async'):
+            return await model.generate_content_async(prompt)
+        return await self._in_thread(work, model.generate_content, prompt)
+
+    def client_stats(self):
+        return dict(self.stats, waiting=self._waiting, abandoned=self._abandoned)
+
+
+def _next_or_stop(iterator):
+    # StopIteration can't cross an executor future, so translate it
+    try:
+        return next(iterator)
+    except StopIteration:
+        raise StopAsyncIteration
+
+
+async def run_until_disconnected(request, awaitable, poll_interval=0.25):
+    """Awaits awaitable, cancelling it if the HTTP client of request disconnects."""
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
@@ -0,0 +1,220 @@
+import asyncio
+import logging
+import math
+from collections import deque
+
+from llm import LLMBusyError
+
+logger = logging.getLogger(__name__)
+
+
+class Provider:
+    """One model backend behind the router: an LLMClient plus its latency and error EWMAs.
+
+    Only successful calls feed the latency EWMA and the percentile window;
+    failures (errors and timeouts) feed the error EWMA.
+    """
+
+    def __init__(self, name, client, alpha=0.2, window=200):
+        self.name = name
+        self.client = client
+        self.alpha = alpha
+        self.latency_ewma = None
+        self.error_ewma = 0.0
+        self._latencies = deque(maxlen=window)
+        self.stats = {'successes': 0, 'failures': 0, 'busy': 0}
+
+    def record_success(self, seconds):
+        self.stats['successes'] += 1
+        self._latencies.append(seconds)
+        if self.latency_ewma is None:
+            self.latency_ewma = seconds
+        else:
+            self.latency_ewma += self.alpha * (seconds - self.latency_ewma)
+        self.error_ewma -= self.alpha * self.error_ewma
+
+    def record_failure(self):
+        self.stats['failures'] += 1
+        self.error_ewma += self.alpha * (1.0 - self.error_ewma)
+
+    def expected_latency(self):
+        """Latency EWMA scaled up by the error rate (expected time per successful answer), or None when untried."""
+        if self.latency_ewma is None:
+            return None
+        return self.latency_ewma / max(1.0 - self.error_ewma, 0.05)
+
+    def percentile(self, q):
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+    def provider_stats(self):
+        return dict(
+            self.stats,
+            latency_ewma=self.latency_ewma or 0.0,
+            error_ewma=self.error_ewma,
+            latency_p95=self.percentile(95) or 0.0,
+            **self.client.client_stats(),
+        )
+
+
+class LLMRouter:
+    """Sends each prompt to the best of several providers, hedging slow calls and falling back on failures.
+
+    Providers are ranked by expected latency (see Provider.expected_latency);
+    untried ones rank after measured ones, in the order given. A call goes to
+    the top provider; if it has not answered after that provider's
+    hedge_percentile latency (or hedge_delay until min_samples calls have
+    been measured), a duplicate goes to the next provider and the first
+    answer wins. A lone provider is only hedged against itself with
+    hedge_self, since every hedge is a second billed call. When a call
+    fails the next provider is tried at once. The whole call, hedges and
+    fallbacks included, is bounded by timeout.
+
+    generate() and stream() have the LLMClient signatures, so the router can
+    stand in for a single client. Streams are never hedged; they fall back
+    only if a provider fails before sending its first chunk.
+    """
+
+    def __init__(self, providers, timeout=30.0, hedge_percentile=95, hedge_delay=5.0, min_samples=20,
+                 hedge_self=False):
+        self.providers = list(providers)
+        self.timeout = timeout
+        self.hedge_percentile = hedge_percentile
+        self.hedge_self = hedge_self
+        self.hedge_delay = hedge_delay
+        self.min_samples = min_samples
+        self.stats = {'calls': 0, 'hedges': 0, 'hedge_wins': 0, 'fallbacks': 0, 'failures': 0}
+
+    def ranked(self):
+        order = {id(p): i for i, p in enumerate(self.providers)}
+
+        def key(provider):
+            expected = provider.expected_latency()
+            return (math.inf if expected is None else expected, provider.error_ewma, order[id(provider)])
+        return sorted(self.providers, key=key)
+
+    def _hedge_after(self, provider):
+        if self.hedge_percentile is None:
+            return None
+        if provider.stats['successes'] < self.min_samples:
+            return self.hedge_delay
+        return provider.percentile(self.hedge_percentile)
+
+    async def generate(self, prompt, timeout=None):
+        """Returns the first successful response text; raises the last error when every provider failed."""
+        self.stats['calls'] += 1
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (timeout or self.timeout)
+        queue = self.ranked()
+        if len(queue) == 1 and self.hedge_self and self.hedge_percentile is not None:
+            # A lone provider hedges against itself only when asked to
+            queue = queue * 2
+        hedge_after = self._hedge_after(queue[0])
+        hedge_at = None if hedge_after is None else loop.time() + hedge_after
+        pending = {}
+        last_error = None
+
+        def launch(provider):
+            task = asyncio.ensure_future(provider.client.generate(prompt, timeout=deadline - loop.time()))
+            pending[task] = (provider, loop.time())
+            return task
+
+        primary = launch(queue.pop(0))
+        hedged = False
+        try:
+            while pending:
+                remaining = deadline - loop.time()
+                wait = remaining
+                if hedge_at is not None and queue and len(pending) == 1:
+                    wait = min(wait, hedge_at - loop.time())
+                done, _ = await asyncio.wait(pending, timeout=max(wait, 0), return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if loop.time() >= deadline:
+                        self.stats['failures'] += 1
+                        raise asyncio.TimeoutError()
+                    if hedge_at is not None and queue and loop.time() >= hedge_at:
+                        self.stats['hedges'] += 1
+                        hedge_at = None
+                        hedged = True
+                        launch(queue.pop(0))
+                    continue
+                for task in done:
+                    provider, started = pending.pop(task)
+                    try:
+                        text = task.result()
+                    except LLMBusyError as e:
+                        # A full queue says nothing about the provider's health
+                        provider.stats['busy'] += 1
+                        last_error = e
+                    except Exception as e:
+                        provider.record_failure()
+                        logger.warning("LLM provider %s failed: %r", provider.name, e)
+                        last_error = e
+                    else:
+                        provider.record_success(loop.time() - started)
+                        if hedged and task is not primary:
+                            self.stats['hedge_wins'] += 1
+                        return text
+                if not pending and queue and loop.time() < deadline:
+                    self.stats['fallbacks'] += 1
+                    hedge_at = None
+                    launch(queue.pop(0))
+            self.stats['failures'] += 1
+            raise last_error or asyncio.TimeoutError()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def stream(self, prompt, timeout=None):
+        """Yields response chunks from the best provider that produces a first chunk."""
+        self.stats['calls'] += 1
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (timeout or self.timeout)
+        last_error = None
+        for attempt, provider in enumerate(self.ranked()):
+            if loop.time() >= deadline:
+                break
+            if attempt:
+                self.stats['fallbacks'] += 1
+            started = loop.time()
+            chunks = provider.client.stream(prompt, timeout=deadline - loop.time())
+            try:
+                try:
+                    first = await chunks.__anext__()
+                except StopAsyncIteration:
+                    provider.record_success(loop.time() - started)
+                    return
+                except LLMBusyError as e:
+                    provider.stats['busy'] += 1
+                    last_error = e
+                    continue
+                except Exception as e:
+                    provider.record_failure()
+                    logger.warning("LLM provider %s failed: %r", provider.name, e)
+                    last_error = e
+                    continue
+                try:
+                    yield first
+                    async for chunk in chunks:
+                        yield chunk
+                except Exception:
+                    provider.record_failure()
+                    raise
+                provider.record_success(loop.time() - started)
+                return
+            finally:
+                await chunks.aclose()
+        self.stats['failures'] += 1
+        raise last_error or asyncio.TimeoutError()
+
+    def client_stats(self):
+        """Router counters plus the summed counters of every provider's client."""
+        stats = dict(self.stats)
+        for provider in self.providers:
+            for name, value in provider.client.client_stats().items():
+                if name != 'calls':
+                    stats[name] = stats.get(name, 0) + value
+        stats['providers'] = {provider.name: provider.provider_stats() for provider in self.providers}
+        return stats
@@ -1,31 +1,146 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError
 import json
+import logging
 import os
 import datetime
-from typing import List, Dict, Union
-import google.generativeai as genai
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, List, Dict, Union, Optional
 from dotenv import load_dotenv
+from user_store import UserStore
+from job_catalog import JobCatalog
+from json_store import JsonFileStore
+from snapshot import Snapshot
+from llm_cache import ResponseCache, make_key
+from matching import SkillMatcher
+from search import SearchIndex
+from questions import IncrementalQuestionParser, QuestionCollector, clean_questions, parse_questions
+from passwords import PasswordHasher
+import metrics
+from logs import configure_logging
+from tokens import TokenError, TokenIssuer, bearer_token, load_or_create_secret
+from prompts import PromptBuilder, SYSTEM_INSTRUCTION
+from llm_router import LLMRouter, Provider
+from precompute import QuestionPrecomputer, QuestionSetStore
+from llm import LLMClient, GeminiModelFactory, OllamaModel, LLMBusyError, ClientDisconnected, run_until_disconnected
 
 # Load environment variables
 load_dotenv()
 
-# Configure Google AI
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-
-# List available models
-available_models = [m.name for m in genai.list_models()]
-print("Available models:", available_models)  # This will help us see which models we can use
+# JSON-lines logs written from a background thread; below WARNING, only LOG_SAMPLE_RATE of records are kept
+log_handler = configure_logging(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    sample_rate=float(os.getenv("LOG_SAMPLE_RATE", "1.0")),
+)
+logger = logging.getLogger("main")
 
-# Define the path to the users JSON file
+# Define the path to the users JSON file (legacy format, migrated into the user store)
 USERS_FILE = os.path.join(os.path.dirname(__file__), 'users.json')
 
+# Indexed user storage
+user_store = UserStore(legacy_json_path=USERS_FILE)
+
 # Define the path to the jobs JSON file
 JOBS_FILE = os.path.join(os.path.dirname(__file__), 'jobs.json')
 
+# Locked, atomic writes to jobs.json
+jobs_file = JsonFileStore(JOBS_FILE)
+
+# scrypt work factor; raising it re-hashes each user's password on their next login
+password_hasher = PasswordHasher(
+    n=int(os.getenv("PASSWORD_SCRYPT_N", str(2 ** 14))),
+    r=int(os.getenv("PASSWORD_SCRYPT_R", "8")),
+    p=int(os.getenv("PASSWORD_SCRYPT_P", "1")),
+    workers=int(os.getenv("PASSWORD_HASH_WORKERS", "0")) or None,
+)
+
+# Signed login tokens; without TOKEN_SECRET every worker shares a random secret kept in TOKEN_SECRET_FILE
+TOKEN_SECRET_FILE = os.getenv("TOKEN_SECRET_FILE", os.path.join(os.path.dirname(__file__), '.token_secret'))
+token_secret = os.getenv("TOKEN_SECRET")
+if not token_secret:
+    logger.warning("TOKEN_SECRET is not set, using the generated secret in %s", TOKEN_SECRET_FILE)
+    token_secret = load_or_create_secret(TOKEN_SECRET_FILE)
+token_issuer = TokenIssuer(
+    token_secret,
+    access_ttl=int(os.getenv("ACCESS_TOKEN_TTL", str(15 * 60))),
+    refresh_ttl=int(os.getenv("REFRESH_TOKEN_TTL", str(7 * 24 * 3600))),
+)
+
+# Cache of generated question sets; set QUESTION_CACHE_DB to persist it across restarts
+question_cache = ResponseCache(
+    max_entries=int(os.getenv("QUESTION_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("QUESTION_CACHE_TTL", "3600")),
+    db_path=os.getenv("QUESTION_CACHE_DB") or None,
+)
+
+# Google AI is configured lazily, on the first question generation
+gemini_model = GeminiModelFactory(
+    'gemini-1.5-flash',
+    system_instruction=SYSTEM_INSTRUCTION,
+    api_key=os.getenv("GEMINI_API_KEY"),
+    models_ttl=float(os.getenv("GEMINI_MODELS_CACHE_TTL", str(24 * 3600))),
+)
+
+# Job descriptions are trimmed to this many (estimated) tokens in prompts
+prompt_builder = PromptBuilder(description_tokens=int(os.getenv("PROMPT_DESCRIPTION_TOKENS", "300")))
+
+# Duplicate detector for generated questions: exact, normalized or minhash (costs in QuestionCollector)
+QUESTION_DEDUP = os.getenv("QUESTION_DEDUP", "exact")
+
+# Question generation providers, tried in this order until their latency has been measured
+LLM_PROVIDERS = [name.strip() for name in os.getenv("LLM_PROVIDERS", "gemini").split(",") if name.strip()]
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+
+def llm_provider(name):
+    """Builds one provider; model calls run off the event loop with a timeout and a bounded queue."""
+    if name == 'gemini':
+        model_factory = gemini_model
+    elif name == 'ollama':
+        model_factory = lambda: OllamaModel(
+            os.getenv("OLLAMA_MODEL", "mistral"),
+            base_url=os.getenv("OLLAMA_URL", "http://localhost:11434"),
+            system_instruction=SYSTEM_INSTRUCTION,
+            timeout=LLM_TIMEOUT,
+        )
+    else:
+        raise ValueError(f"Unknown LLM provider: {name}")
+    return Provider(name, LLMClient(
+        model_factory,
+        concurrency=int(os.getenv("LLM_CONCURRENCY", "8")),
+        queue_size=int(os.getenv("LLM_QUEUE_SIZE", "32")),
+        timeout=LLM_TIMEOUT,
+    ))
+
+# Slow calls are hedged to the next provider after their p95 latency; set LLM_HEDGE_PERCENTILE=0 to disable.
+# A single provider is only hedged against itself, doubling the cost of slow calls, with LLM_HEDGE_SELF=1.
+llm_client = LLMRouter(
+    [llm_provider(name) for name in LLM_PROVIDERS],
+    timeout=LLM_TIMEOUT,
+    hedge_percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", "95")) or None,
+    hedge_delay=float(os.getenv("LLM_HEDGE_DELAY", "5")),
+    hedge_self=os.getenv("LLM_HEDGE_SELF", "0") == "1",
+)
+
+# When every provider fails, answer with the default questions instead of an error
+QUESTION_FALLBACK = os.getenv("QUESTION_FALLBACK", "defaults") == "defaults"
+
+@asynccontextmanager
+async def lifespan(app):
+    if question_precomputer is not None:
+        await question_precomputer.start()
+    # Build the indexes in the background, ahead of the first request
+    start_index_sync(_matcher_state, _sync_skill_matcher)
+    start_index_sync(_search_state, _sync_search_index)
+    yield
+    if question_precomputer is not None:
+        await question_precomputer.stop()
+
 # Initialize FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -35,6 +150,23 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Existing stats endpoints, also exported on /metrics (looked up at scrape time, so swapped-in stores count)
+metrics.REGISTRY.add_stats('user_cache', lambda: user_store.cache_stats())
+metrics.REGISTRY.add_stats('question_cache', lambda: question_cache.cache_stats())
+metrics.REGISTRY.add_stats('llm', lambda: llm_client.client_stats())
+for _provider in llm_client.providers:
+    metrics.REGISTRY.add_stats('llm_' + _provider.name, _provider.provider_stats)
+metrics.REGISTRY.add_stats('passwords', lambda: password_hasher.hasher_stats())
+metrics.REGISTRY.add_stats('tokens', lambda: token_issuer.token_stats())
+metrics.REGISTRY.add_stats('search', lambda: search_index.index_stats())
+metrics.REGISTRY.add_stats('logs', lambda: {'dropped': log_handler.dropped})
+
+@app.exception_handler(TokenError)
+async def token_error_handler(request: Request, exc: TokenError):
+    # The frontend refreshes its access token when it sees this code
+    return JSONResponse(status_code=401, content={"detail": str(exc), "code": exc.code})
 
 # Pydantic models for request data
 class SeekerSignupData(BaseModel):
@@ -88,6 +220,12 @@ class LoginRequest(BaseModel):
     email: str
     password: str
 
+class RefreshRequest(BaseModel):
+    refresh: str
+
+class LogoutRequest(BaseModel):
+    refresh: Optional[str] = None
+
 # Add these new Pydantic models for profile data
 class ProfileResponse(BaseModel):
     name: str
@@ -119,6 +257,20 @@ class QuestionGenerationRequest(BaseModel):
     job_description: str = None
     required_skills: List[str] = None
 
+class BatchJobItem(BaseModel):
+    job_id: str
+    job_title: str = None
+    job_description: str = None
+    required_skills: List[str] = None
+
+class BatchQuestionGenerationRequest(BaseModel):
+    jobs: List[BatchJobItem]  # items with only a job_id are filled in from the job catalog
+    num_questions: int = 5
+    question_types: List[str] = []
+    jobs_per_prompt: int = 4
+    max_parallel: int = 4
+    stream_format: str = "ndjson"  # or "sse"
+
 class Job(BaseModel):
     id: str
     title: str
@@ -130,37 +282,24 @@ class Job(BaseModel):
     job_type: str = None
 
 def read_users():
-    """Reads user data from the JSON file."""
-    if not os.path.exists(USERS_FILE):
-        return []
+    """Reads all user data from the user store."""
     try:
-        with open(USERS_FILE, 'r') as f:
-            # Handle empty file case
-            content = f.read()
-            if not content:
-                return []
-            # Move the file pointer to the beginning after reading content
-            f.seek(0)
-            return json.load(f)
-    except json.JSONDecodeError:
-        # Handle cases where the file is not valid JSON or empty
-        return []
+        return user_store.all()
     except Exception as e:
-        print(f"Error reading users file: {e}")
+        logger.error("Error reading users: %s", e)
         return []
 
 def write_users(users):
-    """Writes user data to the JSON file."""
+    """Replaces all user data in the user store."""
     try:
-        with open(USERS_FILE, 'w') as f:
-            json.dump(users, f, indent=4)
+        user_store.replace_all(users)
     except Exception as e:
-        print(f"Error writing users file: {e}")
+        logger.error("Error writing users: %s", e)
 
 def read_jobs():
     """Reads job data from the JSON file."""
     if not os.path.exists(JOBS_FILE):
-        # Create sample jobs if file doesn't exist
+        # Create sample jobs if file doesn't exist (unless another worker just did)
         sample_jobs = [
             {
                 "id": "1",
@@ -183,39 +322,131 @@ def read_jobs():
                 "job_type": "Full-time"
             }
         ]
-        write_jobs(sample_jobs)
-        return sample_jobs
+        jobs_file.create(sample_jobs)
 
-    try:
-        with open(JOBS_FILE, 'r') as f:
-            content = f.read()
-            if not content:
-                return []
-            return json.load(f)
-    except json.JSONDecodeError:
-        return []
-    except Exception as e:
-        print(f"Error reading jobs file: {e}")
-        return []
+    # A corrupt file raises CorruptFileError instead of reading as an empty job list
+    return jobs_file.read(default=[])
 
 def write_jobs(jobs):
     """Writes job data to the JSON file."""
     try:
-        with open(JOBS_FILE, 'w') as f:
-            json.dump(jobs, f, indent=4)
+        jobs_file.write(jobs)
     except Exception as e:
-        print(f"Error writing jobs file: {e}")
+        logger.error("Error writing jobs file: %s", e)
 
-@app.post("/api/signup")
-async def signup_user_endpoint(user_data: SignupRequest):
-    """FastAPI endpoint to handle user signup."""
-    users = read_users()
+# Optional read-only, memory-mapped snapshot of jobs.json (python snapshot.py jobs.json jobs.snap)
+JOBS_SNAPSHOT = os.getenv("JOBS_SNAPSHOT")
 
-    # Check if email already exists
-    for user in users:
-        if user.get('email') == user_data.email:
-            raise HTTPException(status_code=400, detail="Email already exists.")
+# Indexed job catalog, reloaded only when its file changes
+if JOBS_SNAPSHOT:
+    job_catalog = JobCatalog(JOBS_SNAPSHOT, lambda: Snapshot(JOBS_SNAPSHOT))
+else:
+    job_catalog = JobCatalog(JOBS_FILE, read_jobs)
+
+async def precompute_job_questions(job):
+    """Generates the precomputed question set for one catalog job."""
+    request = QuestionGenerationRequest(
+        job_id=str(job.get('id')),
+        num_questions=question_precomputer.num_questions,
+        question_types=question_precomputer.question_types,
+        job_title=job.get('title'),
+        job_description=job.get('description'),
+        required_skills=list(job.get('required_skills') or []),
+    )
+    return await _generate_questions(request, build_question_prompt(request))
+
+# Set QUESTION_PRECOMPUTE_DB to generate questions for every job in the background, ahead of the first candidate
+QUESTION_PRECOMPUTE_DB = os.getenv("QUESTION_PRECOMPUTE_DB")
+question_precomputer = None
+if QUESTION_PRECOMPUTE_DB:
+    question_precomputer = QuestionPrecomputer(
+        QuestionSetStore(QUESTION_PRECOMPUTE_DB),
+        job_catalog,
+        precompute_job_questions,
+        # The interview page asks for this set
+        num_questions=int(os.getenv("PRECOMPUTE_NUM_QUESTIONS", "5")),
+        question_types=os.getenv("PRECOMPUTE_QUESTION_TYPES", "behavioral,technical,situational").split(","),
+        concurrency=int(os.getenv("PRECOMPUTE_CONCURRENCY", "1")),
+        poll_interval=float(os.getenv("PRECOMPUTE_POLL_INTERVAL", "10")),
+        claim_ttl=float(os.getenv("PRECOMPUTE_CLAIM_TTL", "300")),
+    )
+    metrics.REGISTRY.add_stats('precompute', question_precomputer.precompute_stats)
+
+def _log_sync_error(task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Error syncing an index: %r", task.exception())
+
+def start_index_sync(state, sync):
+    """Runs sync() in a worker thread unless it is already running; returns its task."""
+    task = state['task']
+    if task is None or task.done():
+        task = state['task'] = asyncio.ensure_future(asyncio.to_thread(sync))
+        task.add_done_callback(_log_sync_error)
+    return task
+
+async def await_index_sync(state, sync):
+    """Starts a sync, waiting for it only until the index's first build is done.
+
+    After that, requests are answered from the current index while it catches up.
+    """
+    task = start_index_sync(state, sync)
+    if not state['ready']:
+        await asyncio.shield(task)
+
+# Skill index over seekers and jobs; signups, profile writes and catalog edits from any worker are applied incrementally
+skill_matcher = SkillMatcher()
+_matcher_state = {'user_cursor': None, 'job_version': None, 'task': None, 'ready': False}
+
+def _sync_skill_matcher():
+    job_catalog.refresh()
+    users, _matcher_state['user_cursor'], full = user_store.changes_since(_matcher_state['user_cursor'])
+    if full:
+        skill_matcher.rebuild_seekers(users)
+    else:
+        for user in users:
+            skill_matcher.add_seeker(user)
+    version = job_catalog.version
+    if _matcher_state['job_version'] != version:
+        skill_matcher.sync_jobs(job_catalog.jobs)
+        _matcher_state['job_version'] = version
+    _matcher_state['ready'] = True
+
+async def sync_skill_matcher():
+    """Applies the seekers and jobs written since the last sync, off the event loop."""
+    await await_index_sync(_matcher_state, _sync_skill_matcher)
+
+user_store.add_listener(skill_matcher.add_seeker)
+
+# Full-text index over jobs and seekers; changed seekers and jobs are re-indexed incrementally
+search_index = SearchIndex()
+_search_state = {'user_cursor': None, 'job_version': None, 'task': None, 'ready': False}
+
+def _sync_search_index():
+    job_catalog.refresh()
+    users, _search_state['user_cursor'], full = user_store.changes_since(_search_state['user_cursor'])
+    if full:
+        search_index.rebuild_seekers(users)
+    elif search_index.update_seekers(users):
+        # Mostly replaced profiles; compact the seeker index
+        search_index.rebuild_seekers(user_store.all())
+    version = job_catalog.version
+    if _search_state['job_version'] != version:
+        search_index.sync_jobs(job_catalog.jobs)
+        _search_state['job_version'] = version
+    _search_state['ready'] = True
+
+async def sync_search_index():
+    """Re-indexes the jobs and seekers that changed since the last sync, off the event loop.
+
+    Rebuilds happen on a fresh corpus that is swapped in when done, so
+    searches keep using the previous one meanwhile.
+    """
+    await await_index_sync(_search_state, _sync_search_index)
+
+user_store.add_listener(search_index.add_seeker)
 
+def build_user_record(user_data: SignupRequest):
+    """Validates signup data and returns the user record to store."""
     # Validate password match
     if user_data.password != user_data.re_password:
          raise HTTPException(status_code=400, detail="Passwords do not match.")
@@ -225,7 +456,7 @@ async def signup_user_endpoint(user_data: SignupRequest):
         'role': user_data.role,
         'name': user_data.name,
         'email': user_data.email,
-        'password': user_data.password, # Remember to hash this in a real app!
+        'password': user_data.password,  # Replaced by its hash before the record is stored
         'phone': user_data.phone,
         'created_at': str(datetime.datetime.now()),
     }
@@ -271,148 +502,619 @@ async def signup_user_endpoint(user_data: SignupRequest):
     else:
         raise HTTPException(status_code=400, detail="Invalid role specified.")
 
-    users.append(new_user)
-    write_users(users)
+    return new_user
+
+@app.post("/api/signup")
+async def signup_user_endpoint(user_data: SignupRequest):
+    """FastAPI endpoint to handle user signup."""
+    # Check if email already exists
+    if user_store.get(user_data.email) is not None:
+        raise HTTPException(status_code=400, detail="Email already exists.")
+
+    new_user = build_user_record(user_data)
+    new_user['password'] = await password_hasher.hash_async(new_user['password'])
+
+    # The unique email index also catches a concurrent signup that won the race
+    if not user_store.add(new_user):
+        raise HTTPException(status_code=400, detail="Email already exists.")
 
     return {"message": f"{user_data.role.capitalize()} {user_data.name} signed up successfully!"}
 
+def _validation_detail(error: ValidationError):
+    return "; ".join(
+        f"{'.'.join(str(part) for part in e['loc']) or 'row'}: {e['msg']}" for e in error.errors()
+    )
+
+@app.post("/api/signup/bulk")
+async def bulk_signup_endpoint(users_data: List[Any]):
+    """Sign up many users at once.
+
+    Each row is validated here rather than by FastAPI, so one malformed row
+    doesn't reject the whole batch; see import_signups().
+    """
+    return await import_signups(users_data)
+
+async def import_signups(users_data):
+    """Signs up the given signup dicts, as the bulk endpoint and the src/signup.py import do.
+
+    Rows are validated and deduplicated in one pass and the valid ones are
+    committed to the user store in a single transaction. Invalid or duplicate
+    rows are reported per row (numbered from 0) and don't stop the others.
+    """
+    start = time.perf_counter()
+    records, rows, errors, emails = [], [], [], set()
+    for row, raw in enumerate(users_data):
+        try:
+            user_data = SignupRequest.model_validate(raw)
+        except ValidationError as e:
+            email = raw.get('email') if isinstance(raw, dict) else None
+            errors.append({"row": row, "email": email, "detail": _validation_detail(e)})
+            continue
+        # Weed out known duplicates before paying for their password hash
+        if user_data.email in emails or user_store.get(user_data.email) is not None:
+            errors.append({"row": row, "email": user_data.email, "detail": "Email already exists."})
+            continue
+        try:
+            records.append(build_user_record(user_data))
+            rows.append(row)
+            emails.add(user_data.email)
+        except HTTPException as e:
+            errors.append({"row": row, "email": user_data.email, "detail": e.detail})
+
+    hashes = await asyncio.gather(*(password_hasher.hash_async(record['password']) for record in records))
+    for record, hashed in zip(records, hashes):
+        record['password'] = hashed
+
+    # One transaction for the whole batch, off the event loop
+    created_flags = await asyncio.to_thread(user_store.add_many, records)
+    for row, record, created in zip(rows, records, created_flags):
+        if not created:
+            errors.append({"row": row, "email": record['email'], "detail": "Email already exists."})
+    errors.sort(key=lambda error: error['row'])
+
+    seconds = time.perf_counter() - start
+    return {
+        "created": len(users_data) - len(errors),
+        "failed": len(errors),
+        "errors": errors,
+        "seconds": round(seconds, 4),
+        "records_per_sec": round(len(users_data) / seconds, 1) if seconds > 0 else None,
+    }
+
 @app.post("/api/login")
 async def login_user_endpoint(login_data: LoginRequest):
     """FastAPI endpoint to handle user login."""
-    users = read_users()
-
     # Find the user by email
-    user = next((user for user in users if user.get('email') == login_data.email), None)
+    user = user_store.get(login_data.email)
 
-    # Check if user exists and password matches (plain text comparison for now - hash in real app!)
-    if user is None or user.get('password') != login_data.password:
+    # Verify on the KDF pool; an unknown email is checked against a dummy hash so it takes as long
+    stored = user.get('password') if user is not None else None
+    if not await password_hasher.verify_async(login_data.password, stored):
         raise HTTPException(status_code=401, detail="Invalid email or password.")
 
-    # In a real application, you would generate a JWT or session token here
-    # For now, just return a success message and the user's role and name
-    return {"message": f"Login successful for user {user.get('name')}!", "user": {"name": user.get('name'), "role": user.get('role')}}
+    # Upgrade plaintext passwords and hashes made with an older work factor
+    if password_hasher.needs_rehash(stored):
+        hashed = await password_hasher.hash_async(login_data.password)
+        user_store.update(user['email'], {'password': hashed})
+        password_hasher.stats['rehashes'] += 1
+
+    tokens = token_issuer.issue(user)
+    return {
+        "message": f"Login successful for user {user.get('name')}!",
+        "user": {"name": user.get('name'), "role": user.get('role')},
+        "access": tokens['access'],
+        "refresh": tokens['refresh'],
+    }
+
+def request_role(request: Request):
+    """Returns the role in the request's access token, or None without a valid one."""
+    try:
+        return token_issuer.decode(bearer_token(request.headers.get('authorization'))).get('role')
+    except TokenError:
+        return None
+
+def require_employer(request: Request):
+    """Raises unless the request carries an employer's access token."""
+    claims = token_issuer.decode(bearer_token(request.headers.get('authorization')))
+    if claims.get('role') != 'employer':
+        raise HTTPException(status_code=403, detail="Only employers can see seekers.")
+
+@app.get("/auth/users/me")
+async def current_user(request: Request):
+    """Returns the user of the access token; the token alone answers, no user lookup."""
+    claims = token_issuer.decode(bearer_token(request.headers.get('authorization')))
+    return {"email": claims['sub'], "name": claims.get('name'), "role": claims.get('role')}
+
+@app.post("/auth/jwt/refresh/")
+async def refresh_tokens(refresh_data: RefreshRequest):
+    """Trades a refresh token for a new access/refresh pair; the old refresh token is revoked."""
+    claims = token_issuer.decode(refresh_data.refresh, token_type='refresh')
+    token_issuer.revoke(claims)
+    return token_issuer.issue({'email': claims['sub'], 'name': claims.get('name'), 'role': claims.get('role')})
+
+@app.post("/auth/logout")
+async def logout(request: Request, logout_data: Optional[LogoutRequest] = None):
+    """Revokes the access token and, if given, the refresh token."""
+    token_issuer.revoke(token_issuer.decode(bearer_token(request.headers.get('authorization'))))
+    if logout_data is not None and logout_data.refresh:
+        try:
+            token_issuer.revoke(token_issuer.decode(logout_data.refresh, token_type='refresh'))
+        except TokenError:
+            pass
+    return {"message": "Logged out."}
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Request latency per route, per-stage timings, token and error counters in Prometheus text format."""
+    return Response(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/stats/user-cache")
+async def user_cache_stats():
+    """Hit/miss/reload counters of the in-memory user index."""
+    return user_store.cache_stats()
+
+@app.get("/api/stats/passwords")
+async def password_stats():
+    """Hash/verify counters and the current scrypt parameters."""
+    return password_hasher.hasher_stats()
+
+@app.get("/api/stats/tokens")
+async def token_stats():
+    """Issued/verified token counters, decoded-token cache size and revocations."""
+    return token_issuer.token_stats()
+
+@app.get("/api/stats/question-cache")
+async def question_cache_stats():
+    """Hit/miss/coalescing counters of the generated question cache."""
+    return question_cache.cache_stats()
+
+@app.get("/api/stats/precompute")
+async def precompute_stats():
+    """Queue, generation and lookup counters of the background question precomputation."""
+    if question_precomputer is None:
+        return {'enabled': False}
+    return dict(question_precomputer.precompute_stats(), enabled=True)
+
+@app.get("/api/stats/llm")
+async def llm_stats():
+    """Router hedge/fallback counters, summed client counters and per-provider latency and error EWMAs."""
+    return llm_client.client_stats()
+
+def normalize_question_request(request: QuestionGenerationRequest):
+    """Canonical form of a question request, used for cache keys."""
+    return {
+        'job_id': request.job_id,
+        'num_questions': request.num_questions,
+        'question_types': sorted({t.strip().lower() for t in request.question_types}),
+        'job_title': ' '.join((request.job_title or '').split()),
+        'job_description': ' '.join((request.job_description or '').split()),
+        'required_skills': [s.strip() for s in request.required_skills or []],
+    }
+
+def build_question_prompt(request: QuestionGenerationRequest):
+    """Builds the question-generation prompt for one job."""
+    return prompt_builder.question_prompt(
+        request.job_title, request.job_description, request.required_skills,
+        request.num_questions, request.question_types,
+    )
+
+def default_questions(request: QuestionGenerationRequest):
+    """Generic questions used to pad a short model answer."""
+    return [
+        "Can you walk me through your professional background and what led you to apply for this position?",
+        f"Tell me about your experience with {request.required_skills[0] if request.required_skills else 'the key technologies'} used in this role.",
+        "How do you handle challenging situations in the workplace?",
+        "What interests you most about this position at " + (request.job_title or "our company") + "?",
+        "Can you describe a project where you demonstrated leadership?"
+    ]
+
+def finalize_questions(request: QuestionGenerationRequest, questions):
+    """Deduplicates questions and trims or pads them to request.num_questions."""
+    collector = QuestionCollector(request.num_questions, default_questions(request), QUESTION_DEDUP)
+    collector.extend(questions)
+    if collector.duplicates:
+        logger.debug("Removed %d duplicate questions", collector.duplicates, extra={'job_id': request.job_id})
+
+    # Ensure we have the requested number of questions
+    if not collector.full:
+        kept = len(collector.questions)
+        padded = collector.pad()
+        logger.info("Padded %d model questions with %d defaults", kept, len(padded), extra={'job_id': request.job_id})
+
+    return collector.questions
+
+async def _generate_questions(request: QuestionGenerationRequest, prompt: str):
+    """Calls the model with prompt and post-processes its output into a question list."""
+    logger.debug("Sending prompt to AI", extra={'job_id': request.job_id, 'prompt': prompt})
+
+    # Generate response without blocking the event loop
+    response_text = await llm_client.generate(prompt)
+
+    # Parse the response and extract questions
+    questions_text = response_text.strip()
+    logger.debug("Raw AI response", extra={'job_id': request.job_id, 'response': questions_text})
+
+    with metrics.stage('postprocess'):
+        return finalize_questions(request, parse_questions(questions_text))
+
+async def precomputed_questions(request: QuestionGenerationRequest):
+    """Returns the background-generated questions for this request, if they match the job's current content."""
+    if question_precomputer is None:
+        return None
+    return await question_precomputer.lookup(
+        request.job_id, request.job_title, request.job_description, request.required_skills,
+        request.num_questions, request.question_types,
+    )
+
+def fallback_questions(request: QuestionGenerationRequest, reason: str):
+    """Default questions for when no provider answered; not cached, so the next request tries the model again."""
+    metrics.ERRORS.inc(where='question_fallback')
+    logger.warning("Serving default questions (%s)", reason, extra={'job_id': request.job_id})
+    return {"questions": finalize_questions(request, []), "fallback": True}
+
+def question_cache_key(request: QuestionGenerationRequest, prompt: str):
+    return make_key('generate-questions', normalize_question_request(request), SYSTEM_INSTRUCTION, prompt)
 
 @app.post("/api/generate-questions")
-async def generate_questions(request: QuestionGenerationRequest):
+async def generate_questions(request: QuestionGenerationRequest, http_request: Request):
     """Generate AI-powered interview questions based on job requirements."""
     try:
-        # Initialize the model
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        
-        # Create a more detailed prompt with job context and specific instructions
-        prompt = f"""You are an expert HR professional conducting an interview for a {request.job_title} position.
-        
-        Job Description: {request.job_description}
-        Required Skills: {', '.join(request.required_skills) if request.required_skills else 'Not specified'}
-        
-        Generate {request.num_questions} completely different interview questions. Each question must be unique in both topic and approach.
-        
-        Question Types to Include:
-        - Technical questions about specific skills
-        - Behavioral questions about past experiences
-        - Situational questions about hypothetical scenarios
-        - Problem-solving questions
-        - Leadership and teamwork questions
-        
-        Guidelines:
-        1. Each question must be completely different from the others
-        2. Questions should progress from general to specific
-        3. Include at least one question about each required skill
-        4. Mix different question types
-        5. Avoid similar questions or rephrasing of the same question
-        6. Make questions specific to the {request.job_title} role
-        7. First question should be a general introduction/background question
-        8. Second question should be about technical skills or experience
-        9. Third question should be about problem-solving or behavioral scenario
-        10. Fourth question should be about leadership or teamwork
-        11. Fifth question should be about future goals or company fit
-        
-        Format your response as a JSON array of strings, with no additional text or formatting.
-        Example format: ["Question 1?", "Question 2?", "Question 3?"]"""
-
-        print("Sending prompt to AI:", prompt)  # Debug log
-
-        # Generate response
-        response = model.generate_content(prompt)
-        
-        # Parse the response and extract questions
-        questions_text = response.text.strip()
-        print("Raw AI response:", questions_text)  # Debug log
-        
-        # Try to parse the response as JSON
-        try:
-            # Clean the response text before parsing
-            cleaned_text = questions_text
-            # Remove any markdown code block markers
-            cleaned_text = cleaned_text.replace('```json', '').replace('```', '')
-            # Remove any leading/trailing whitespace
-            cleaned_text = cleaned_text.strip()
-            
-            questions = json.loads(cleaned_text)
-            print("Parsed questions:", questions)  # Debug log
-            
-            # Clean each question
-            questions = [q.strip() for q in questions]
-            # Remove any remaining JSON artifacts
-            questions = [q.replace('[', '').replace(']', '').replace('{', '').replace('}', '') for q in questions]
-            # Remove any empty questions
-            questions = [q for q in questions if q and not q.isspace()]
-            
-        except json.JSONDecodeError as e:
-            print("JSON parsing error:", str(e))  # Debug log
-            # If the response isn't valid JSON, try to extract questions from the text
-            questions = [q.strip() for q in questions_text.split('\n') if q.strip()]
-            # Remove any markdown formatting, numbers, or JSON artifacts
-            questions = [q.lstrip('1234567890.- ').strip() for q in questions]
-            questions = [q.replace('[', '').replace(']', '').replace('{', '').replace('}', '') for q in questions]
-            # Remove any empty questions
-            questions = [q for q in questions if q and not q.isspace()]
-            print("Extracted questions after JSON error:", questions)  # Debug log
-
-        # Remove any duplicate questions
-        original_count = len(questions)
-        questions = list(dict.fromkeys(questions))
-        if len(questions) < original_count:
-            print(f"Removed {original_count - len(questions)} duplicate questions")  # Debug log
-
-        # Ensure we have the requested number of questions
-        if len(questions) > request.num_questions:
-            questions = questions[:request.num_questions]
-        elif len(questions) < request.num_questions:
-            print(f"Not enough questions ({len(questions)}), adding default questions")  # Debug log
-            # If we don't have enough questions, add some generic ones
-            default_questions = [
-                "Can you walk me through your professional background and what led you to apply for this position?",
-                f"Tell me about your experience with {request.required_skills[0] if request.required_skills else 'the key technologies'} used in this role.",
-                "How do you handle challenging situations in the workplace?",
-                "What interests you most about this position at " + (request.job_title or "our company") + "?",
-                "Can you describe a project where you demonstrated leadership?"
-            ]
-            # Filter out any default questions that might be similar to existing ones
-            default_questions = [q for q in default_questions if not any(
-                q.lower() in existing.lower() or existing.lower() in q.lower() 
-                for existing in questions
-            )]
-            print("Filtered default questions:", default_questions)  # Debug log
-            questions.extend(default_questions[:request.num_questions - len(questions)])
-
-        print("Final questions:", questions)  # Debug log
+        questions = await precomputed_questions(request)
+        if questions is not None:
+            return {"questions": questions}
+
+        prompt = build_question_prompt(request)
+
+        # Identical requests share one cached (or in-flight) LLM call
+        cache_key = question_cache_key(request, prompt)
+        questions = await run_until_disconnected(
+            http_request,
+            question_cache.get_or_compute(cache_key, lambda: _generate_questions(request, prompt)),
+        )
+
+        logger.debug("Final questions", extra={'job_id': request.job_id, 'questions': questions})
         return {"questions": questions}
 
+    except LLMBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except asyncio.TimeoutError:
+        if QUESTION_FALLBACK:
+            return fallback_questions(request, "timeout")
+        raise HTTPException(status_code=504, detail="Question generation timed out.")
+    except ClientDisconnected:
+        # Nobody is listening any more; the status only shows up in access logs
+        raise HTTPException(status_code=499, detail="Client disconnected.")
     except Exception as e:
-        print(f"Error generating questions: {str(e)}")  # Debug log
+        logger.exception("Error generating questions", extra={'job_id': request.job_id})
+        metrics.ERRORS.inc(where='generate_questions')
+        if QUESTION_FALLBACK:
+            return fallback_questions(request, "error")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/generate-questions/stream")
+async def generate_questions_stream(request: QuestionGenerationRequest):
+    """Stream interview questions over server-sent events as the model writes them.
+
+    Emits a "question" event for each question as soon as it is complete, then
+    a "done" event with the final list (after default padding), or an "error"
+    event. The finished list is stored in the question cache.
+    """
+    prompt = build_question_prompt(request)
+    cache_key = question_cache_key(request, prompt)
+
+    def event(name, data):
+        return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+    async def events():
+        cached = await precomputed_questions(request)
+        if cached is None:
+            cached = question_cache.get(cache_key)
+        if cached is not None:
+            for index, question in enumerate(cached):
+                yield event("question", {"index": index, "question": question})
+            yield event("done", {"questions": cached})
+            return
+
+        collector = QuestionCollector(request.num_questions, default_questions(request), QUESTION_DEDUP)
+        parser = IncrementalQuestionParser()
+        chunks = llm_client.stream(prompt)
+        failed = None
+        try:
+            async for chunk in chunks:
+                for question in clean_questions(parser.feed(chunk)):
+                    if collector.add(question):
+                        yield event("question", {"index": len(collector.questions) - 1, "question": question})
+                if collector.full:
+                    break
+            if not parser.saw_array:
+                # Not a JSON array after all; fall back to the line-based parser
+                for question in parse_questions(parser.text.strip()):
+                    if collector.add(question):
+                        yield event("question", {"index": len(collector.questions) - 1, "question": question})
+        except LLMBusyError as e:
+            yield event("error", {"detail": str(e)})
+            return
+        except asyncio.TimeoutError:
+            if not QUESTION_FALLBACK:
+                yield event("error", {"detail": "Question generation timed out."})
+                return
+            failed = "timeout"
+        except Exception as e:
+            logger.exception("Error streaming questions", extra={'job_id': request.job_id})
+            metrics.ERRORS.inc(where='generate_questions_stream')
+            if not QUESTION_FALLBACK:
+                yield event("error", {"detail": str(e)})
+                return
+            failed = "error"
+        finally:
+            # Release the model slot now rather than when the generator is collected
+            await chunks.aclose()
+
+        # After a failure, questions already sent are kept and the rest padded with defaults
+        start = len(collector.questions)
+        for index, question in enumerate(collector.pad(), start):
+            yield event("question", {"index": index, "question": question})
+        if failed:
+            metrics.ERRORS.inc(where='question_fallback')
+            logger.warning("Padded a failed stream with default questions (%s)", failed, extra={'job_id': request.job_id})
+            yield event("done", {"questions": collector.questions, "fallback": True})
+            return
+        question_cache.set(cache_key, collector.questions)
+        yield event("done", {"questions": collector.questions})
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+def build_batch_prompt(requests: List[QuestionGenerationRequest]):
+    """Builds one prompt asking for question sets for several jobs at once."""
+    return prompt_builder.batch_prompt(
+        [(r.job_id, r.job_title, r.job_description, r.required_skills) for r in requests],
+        requests[0].num_questions, requests[0].question_types,
+    )
+
+def resolve_batch_item(item: BatchJobItem, batch: BatchQuestionGenerationRequest):
+    """Turns a batch item into a single-job request, filling missing fields from the catalog."""
+    fields = {'job_title': item.job_title, 'job_description': item.job_description, 'required_skills': item.required_skills}
+    if any(value is None for value in fields.values()):
+        job = job_catalog.get(item.job_id)
+        if job is None:
+            raise ValueError("Job not found")
+        fields = {
+            'job_title': item.job_title or job.get('title'),
+            'job_description': item.job_description or job.get('description'),
+            'required_skills': item.required_skills if item.required_skills is not None else job.get('required_skills'),
+        }
+    return QuestionGenerationRequest(
+        job_id=item.job_id, num_questions=batch.num_questions, question_types=batch.question_types, **fields
+    )
+
+async def _generate_question_group(requests: List[QuestionGenerationRequest]):
+    """Generates question sets for a group of jobs with one packed prompt.
+
+    Returns ({job_id: questions}, {job_id: error}). Jobs missing from the
+    model's answer are generated individually, and one of those failing only
+    fails its own job.
+    """
+    results = {}
+    errors = {}
+    if len(requests) > 1:
+        prompt = build_batch_prompt(requests)
+        logger.debug("Sending batch prompt to AI", extra={'job_ids': [r.job_id for r in requests], 'prompt': prompt})
+        response_text = (await llm_client.generate(prompt)).strip()
+        try:
+            packed = json.loads(response_text.replace('```json', '').replace('```', '').strip())
+        except json.JSONDecodeError as e:
+            logger.warning("Batch JSON parsing error: %s", e, extra={'job_ids': [r.job_id for r in requests]})
+            metrics.ERRORS.inc(where='batch_parse')
+            packed = {}
+        if not isinstance(packed, dict):
+            packed = {}
+        for request in requests:
+            questions = clean_questions(packed.get(request.job_id) or [])
+            if questions:
+                results[request.job_id] = finalize_questions(request, questions)
+                question_cache.set(question_cache_key(request, build_question_prompt(request)), results[request.job_id])
+
+    for request in requests:
+        if request.job_id not in results:
+            prompt = build_question_prompt(request)
+            try:
+                results[request.job_id] = await question_cache.get_or_compute(
+                    question_cache_key(request, prompt), lambda request=request, prompt=prompt: _generate_questions(request, prompt)
+                )
+            except Exception as e:
+                logger.warning("Error generating questions for a batch job: %r", e, extra={'job_id': request.job_id})
+                errors[request.job_id] = e
+    return results, errors
+
+@app.post("/api/generate-questions/batch")
+async def generate_questions_batch(batch: BatchQuestionGenerationRequest):
+    """Generate question sets for many jobs, streaming each job's result as it finishes.
+
+    Cached and precomputed jobs are answered immediately; the rest are packed jobs_per_prompt
+    to a prompt and run with at most max_parallel prompts in flight. Each
+    result is one NDJSON line (or SSE event) of {"job_id", "questions"} or
+    {"job_id", "error"}; default questions served after a failure carry
+    "fallback": true.
+    """
+    if batch.stream_format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="stream_format must be 'ndjson' or 'sse'.")
+    jobs_per_prompt = max(1, batch.jobs_per_prompt)
+    max_parallel = max(1, batch.max_parallel)
+
+    def encode(result):
+        line = json.dumps(result)
+        return f"data: {line}\n\n" if batch.stream_format == "sse" else line + "\n"
+
+    async def results():
+        pending = []
+        for item in batch.jobs:
+            try:
+                request = resolve_batch_item(item, batch)
+            except ValueError as e:
+                yield encode({"job_id": item.job_id, "error": str(e)})
+                continue
+            cached = await precomputed_questions(request)
+            if cached is None:
+                cached = question_cache.get(question_cache_key(request, build_question_prompt(request)))
+            if cached is not None:
+                yield encode({"job_id": request.job_id, "questions": cached})
+            else:
+                pending.append(request)
+
+        groups = [pending[i:i + jobs_per_prompt] for i in range(0, len(pending), jobs_per_prompt)]
+        semaphore = asyncio.Semaphore(max_parallel)
+
+        async def run_group(group):
+            async with semaphore:
+                try:
+                    results, errors = await _generate_question_group(group)
+                    return group, results, errors, None
+                except Exception as e:
+                    return group, {}, {}, e
+
+        tasks = [asyncio.ensure_future(run_group(group)) for group in groups]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                group, group_results, job_errors, group_error = await next_done
+                for request in group:
+                    error = job_errors.get(request.job_id, group_error)
+                    if request.job_id in group_results:
+                        yield encode({"job_id": request.job_id, "questions": group_results[request.job_id]})
+                    elif QUESTION_FALLBACK and not isinstance(error, LLMBusyError):
+                        yield encode({"job_id": request.job_id, **fallback_questions(request, "batch")})
+                    else:
+                        detail = "Question generation timed out." if isinstance(error, asyncio.TimeoutError) else str(error)
+                        yield encode({"job_id": request.job_id, "error": detail})
+        finally:
+            # The client went away or the stream finished; stop any remaining work
+            for task in tasks:
+                task.cancel()
+        if batch.stream_format == "sse":
+            yield "event: done\ndata: {}\n\n"
+
+    media_type = "text/event-stream" if batch.stream_format == "sse" else "application/x-ndjson"
+    return StreamingResponse(results(), media_type=media_type)
+
+@app.get("/api/jobs")
+async def list_jobs(
+    request: Request,
+    company: Optional[List[str]] = Query(None),
+    location: Optional[List[str]] = Query(None),
+    job_type: Optional[List[str]] = Query(None),
+    skill: Optional[List[str]] = Query(None),
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+):
+    """List jobs matching all given filters, one page at a time.
+
+    Pass the returned next_cursor back as cursor to fetch the following page.
+    """
+    filters = {field: values for field, values in (
+        ('company', company), ('location', location), ('job_type', job_type), ('skill', skill)
+    ) if values}
+    job_catalog.refresh()
+    etag = job_catalog.etag(sorted((k, sorted(v)) for k, v in filters.items()), cursor, limit)
+    if request.headers.get('if-none-match') == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    try:
+        jobs, next_cursor = job_catalog.search(filters, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    response = JSONResponse({"results": [dict(job) for job in jobs], "next_cursor": next_cursor})
+    response.headers["ETag"] = etag
+    return response
+
+@app.get("/api/jobs/{job_id}/candidates")
+async def job_candidates(request: Request, job_id: str, limit: int = Query(10, ge=1, le=100)):
+    """Top seekers for a job, ranked by the share of its required skills they have. Employers only."""
+    require_employer(request)
+    await sync_skill_matcher()
+    job = job_catalog.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    results = []
+    for email, score, matched in skill_matcher.top_candidates(job.get('required_skills'), limit):
+        user = user_store.get(email) or {}
+        results.append({
+            "email": email,
+            "name": user.get('name'),
+            "job_title": user.get('job_title'),
+            "location": user.get('location'),
+            "score": round(score, 4),
+            "matched_skills": matched,
+        })
+    return {"job_id": job_id, "results": results}
+
+@app.get("/api/users/{email}/recommended-jobs")
+async def recommended_jobs(email: str, limit: int = Query(10, ge=1, le=100)):
+    """Top jobs for a seeker, ranked by the share of each job's required skills they have."""
+    await sync_skill_matcher()
+    user = user_store.get(email)
+    if user is None or user.get('role') != 'seeker':
+        raise HTTPException(status_code=404, detail="Seeker not found")
+
+    results = []
+    for job_id, score, matched in skill_matcher.top_jobs(user.get('skills'), limit):
+        job = job_catalog.get(job_id)
+        if job is not None:
+            results.append(dict(job, score=round(score, 4), matched_skills=matched))
+    return {"email": email, "results": results}
+
+@app.get("/api/search")
+async def search(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    kind: str = Query("all", alias="type", pattern="^(all|jobs|seekers)$"),
+    limit: int = Query(10, ge=1, le=100),
+):
+    """Full-text search over jobs and seeker profiles, BM25-ranked.
+
+    The last word also matches as a prefix, for search-as-you-type, and words
+    with no exact match find terms one typo away. Seeker profiles are only
+    searched for employers; anyone else gets job results only.
+    """
+    if kind != "jobs" and request_role(request) != 'employer':
+        kind = "jobs"
+    with metrics.stage('search'):
+        await sync_search_index()
+        response = {"query": q}
+        if kind in ("all", "jobs"):
+            response["jobs"] = []
+            for job_id, score in search_index.search_jobs(q, limit):
+                job = job_catalog.get(job_id)
+                if job is not None:
+                    response["jobs"].append(dict(job, score=round(score, 4)))
+        if kind in ("all", "seekers"):
+            response["seekers"] = []
+            for email, score in search_index.search_seekers(q, limit):
+                user = user_store.get(email) or {}
+                response["seekers"].append({
+                    "email": email,
+                    "name": user.get('name'),
+                    "job_title": user.get('job_title'),
+                    "skills": user.get('skills'),
+                    "location": user.get('location'),
+                    "score": round(score, 4),
+                })
+    return response
+
+@app.get("/api/stats/search")
+async def search_stats():
+    """Indexed jobs and seekers, including rows replaced since the last rebuild, and vocabulary sizes."""
+    return search_index.index_stats()
+
 @app.get("/api/jobs/{job_id}")
 async def get_job(job_id: str):
     """Get job details by ID."""
-    jobs = read_jobs()
-    job = next((job for job in jobs if job.get('id') == job_id), None)
-    
+    job = job_catalog.get(job_id)
+
     if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    return job
+    return dict(job)
 
 # You would typically run this with uvicorn:
 # python -m uvicorn backend.main:app --reload 
\ No newline at end of file
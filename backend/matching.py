@@ -0,0 +1,245 @@
+import threading
+
+import numpy as np
+
+
+def normalize_skills(skills):
+    """Returns the lower-cased, de-duplicated skills of a record.
+
+    Seekers store skills either as a list or as one comma-separated string.
+    """
+    if isinstance(skills, str):
+        skills = skills.split(',')
+    seen = []
+    for skill in skills or []:
+        if isinstance(skill, str):
+            skill = skill.strip().lower()
+            if skill and skill not in seen:
+                seen.append(skill)
+    return seen
+
+
+class _IntArray:
+    """Growable int32 array, doubling its capacity as it fills."""
+
+    __slots__ = ('_data', '_size')
+
+    def __init__(self):
+        self._data = np.empty(4, dtype=np.int32)
+        self._size = 0
+
+    def append(self, row):
+        if self._size == len(self._data):
+            grown = np.empty(len(self._data) * 2, dtype=np.int32)
+            grown[:self._size] = self._data[:self._size]
+            self._data = grown
+        self._data[self._size] = row
+        self._size += 1
+
+    def remove(self, row):
+        data = self.view()
+        kept = data[data != row]
+        self._data[:len(kept)] = kept
+        self._size = len(kept)
+
+    def view(self):
+        return self._data[:self._size]
+
+
+class _Side:
+    """One side of the match (seekers or jobs): rows, their skill sets and a skill -> rows index."""
+
+    def __init__(self):
+        self.keys = []
+        self.rows = {}
+        self.skills = []
+        self.sizes = _IntArray()
+        self.postings = {}
+
+    def add(self, key, skills):
+        """Indexes key's skills, replacing those of an earlier version in place. Returns its row."""
+        if key in self.rows:
+            return self._replace(self.rows[key], skills)
+        row = len(self.keys)
+        self.keys.append(key)
+        self.rows[key] = row
+        self.skills.append(tuple(skills))
+        self.sizes.append(len(skills))
+        for skill in skills:
+            postings = self.postings.get(skill)
+            if postings is None:
+                postings = self.postings[skill] = _IntArray()
+            postings.append(row)
+        return row
+
+    def remove(self, key):
+        row = self.rows.pop(key, None)
+        if row is None:
+            return False
+        for skill in self.skills[row]:
+            self.postings[skill].remove(row)
+        # The row stays allocated but is in no posting list, so no query can reach it
+        self.keys[row] = None
+        self.skills[row] = ()
+        return True
+
+    def fragmented(self):
+        """True once more than half of the rows were removed, when rebuilding beats carrying them."""
+        return len(self.keys) > 2 * max(len(self.rows), 1)
+
+    def _replace(self, row, skills):
+        old = self.skills[row]
+        if old == tuple(skills):
+            return row
+        for skill in old:
+            if skill not in skills:
+                self.postings[skill].remove(row)
+        for skill in skills:
+            if skill not in old:
+                postings = self.postings.get(skill)
+                if postings is None:
+                    postings = self.postings[skill] = _IntArray()
+                postings.append(row)
+        self.skills[row] = tuple(skills)
+        self.sizes.view()[row] = len(skills)
+        return row
+
+    def overlap(self, skills):
+        """Returns (rows, counts): every row sharing a skill with skills and how many it shares."""
+        arrays = [self.postings[s].view() for s in skills if s in self.postings]
+        if not arrays:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32)
+        hits = np.concatenate(arrays) if len(arrays) > 1 else arrays[0]
+        if len(hits) * 8 > len(self.keys):
+            # Dense: one counting pass over all rows
+            counts = np.bincount(hits, minlength=len(self.keys))
+            rows = np.flatnonzero(counts)
+            return rows, counts[rows]
+        # Sparse: sort only the rows that matched
+        return np.unique(hits, return_counts=True)
+
+
+def _top_k(rows, scores, counts, k):
+    """Indexes into rows of the k best scores, best first (ties broken by shared-skill count)."""
+    if len(rows) > k:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(rows))
+    order = np.lexsort((-counts[candidates], -scores[candidates]))
+    return candidates[order]
+
+
+class SkillMatcher:
+    """Ranks seekers for a job and jobs for a seeker by shared skills.
+
+    Both sides keep an inverted index from skill to an int32 array of rows.
+    A query gathers the posting arrays of its skills and counts shared skills
+    per row in one vectorized bincount/unique pass, so the cost depends on how
+    many rows share a skill, not on the total number of seekers or jobs.
+    Seekers and jobs are added incrementally; adding one again replaces its
+    skills in place, and sync_jobs() applies only the jobs that changed.
+    Updates may come from another thread: queries hold the lock while they
+    read the postings.
+
+    The score is the fraction of the job's required skills the seeker has.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.seekers = _Side()
+        self.jobs = _Side()
+
+    def add_seeker(self, user):
+        if user.get('role') != 'seeker' or not user.get('email'):
+            return
+        with self._lock:
+            self.seekers.add(user['email'], normalize_skills(user.get('skills')))
+
+    def add_job(self, job):
+        if job.get('id') is None:
+            return
+        with self._lock:
+            self.jobs.add(str(job['id']), normalize_skills(job.get('required_skills')))
+
+    def rebuild_seekers(self, users):
+        side = _Side()
+        for user in users:
+            if user.get('role') == 'seeker' and user.get('email'):
+                side.add(user['email'], normalize_skills(user.get('skills')))
+        with self._lock:
+            self.seekers = side
+
+    def rebuild_jobs(self, jobs):
+        side = _Side()
+        for job in jobs:
+            if job.get('id') is not None:
+                side.add(str(job['id']), normalize_skills(job.get('required_skills')))
+        with self._lock:
+            self.jobs = side
+
+    def sync_jobs(self, jobs):
+        """Brings the job side in line with jobs, re-indexing only added, changed and removed jobs.
+
+        Returns the number of jobs re-indexed or removed. Falls back to a full
+        rebuild once more than half of the rows belong to removed jobs.
+        """
+        with self._lock:
+            side = self.jobs
+            if side.fragmented():
+                side = None
+        if side is None:
+            self.rebuild_jobs(jobs)
+            return len(jobs)
+        changed = 0
+        seen = set()
+        for job in jobs:
+            if job.get('id') is None:
+                continue
+            key = str(job['id'])
+            seen.add(key)
+            skills = normalize_skills(job.get('required_skills'))
+            row = side.rows.get(key)
+            if row is None or side.skills[row] != tuple(skills):
+                with self._lock:
+                    side.add(key, skills)
+                changed += 1
+        with self._lock:
+            for key in [key for key in side.rows if key not in seen]:
+                changed += side.remove(key)
+        return changed
+
+    def top_candidates(self, job_skills, k=10):
+        """Returns [(email, score, matched_skills)] of the k seekers best matching job_skills."""
+        skills = normalize_skills(job_skills)
+        if not skills:
+            return []
+        with self._lock:
+            seekers = self.seekers
+            rows, counts = seekers.overlap(skills)
+            if not len(rows):
+                return []
+            scores = counts / len(skills)
+            results = []
+            for i in _top_k(rows, scores, counts, k):
+                row = int(rows[i])
+                matched = [s for s in skills if s in seekers.skills[row]]
+                results.append((seekers.keys[row], float(scores[i]), matched))
+        return results
+
+    def top_jobs(self, seeker_skills, k=10):
+        """Returns [(job_id, score, matched_skills)] of the k jobs best matching seeker_skills."""
+        skills = normalize_skills(seeker_skills)
+        if not skills:
+            return []
+        with self._lock:
+            jobs = self.jobs
+            rows, counts = jobs.overlap(skills)
+            if not len(rows):
+                return []
+            scores = counts / jobs.sizes.view()[rows]
+            results = []
+            for i in _top_k(rows, scores, counts, k):
+                row = int(rows[i])
+                matched = [s for s in jobs.skills[row] if s in skills]
+                results.append((jobs.keys[row], float(scores[i]), matched))
+        return results
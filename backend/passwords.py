@@ -0,0 +1,131 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+SCHEME = 'scrypt'
+
+
+def _b64encode(raw):
+    return base64.b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _b64decode(text):
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+
+class PasswordHasher:
+    """Hashes and verifies passwords with scrypt, off the event loop.
+
+    Hashes are stored as "scrypt$n$r$p$salt$hash" so the work factor can be
+    raised later: verify() reads the parameters from the stored hash and
+    needs_rehash() says when a record should be re-hashed with the current
+    ones. Records that still hold a plaintext password verify with a
+    constant-time comparison and always need a rehash.
+
+    hashlib.scrypt releases the GIL while it runs, so the *_async methods use a
+    dedicated thread pool sized to the CPU count: hashes run in parallel and
+    the event loop stays free to serve other requests.
+    """
+
+    def __init__(self, n=2 ** 14, r=8, p=1, salt_size=16, key_size=32, workers=None):
+        self.n = n
+        self.r = r
+        self.p = p
+        self.salt_size = salt_size
+        self.key_size = key_size
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = None
+        # Verified against when the user doesn't exist, so a wrong email costs as much as a wrong password
+        self._dummy_hash = None
+        self.stats = {'hashes': 0, 'verifies': 0, 'failures': 0, 'rehashes': 0}
+
+    def _scrypt(self, password, salt, n, r, p, key_size):
+        # scrypt needs 128 * r * n bytes; leave headroom over OpenSSL's 32 MiB default
+        maxmem = 128 * r * n * 2 + 1024 * 1024
+        return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p, maxmem=maxmem, dklen=key_size)
+
+    def hash(self, password):
+        """Returns the encoded scrypt hash of password with the current parameters."""
+        salt = secrets.token_bytes(self.salt_size)
+        with metrics.stage('password_hash'):
+            key = self._scrypt(password, salt, self.n, self.r, self.p, self.key_size)
+        self.stats['hashes'] += 1
+        return f"{SCHEME}${self.n}${self.r}${self.p}${_b64encode(salt)}${_b64encode(key)}"
+
+    def verify(self, password, stored):
+        """Returns True if password matches stored, a hash from hash() or a legacy plaintext password."""
+        self.stats['verifies'] += 1
+        if stored is None:
+            if self._dummy_hash is None:
+                self._dummy_hash = self.hash(secrets.token_hex(8))
+            stored = self._dummy_hash
+            password = None
+        if not isinstance(stored, str) or not stored.startswith(SCHEME + '$'):
+            ok = isinstance(stored, str) and password is not None and hmac.compare_digest(
+                stored.encode('utf-8'), password.encode('utf-8')
+            )
+        else:
+            try:
+                _, n, r, p, salt, key = stored.split('$')
+                key = _b64decode(key)
+                with metrics.stage('password_verify'):
+                    candidate = self._scrypt(password or '', _b64decode(salt), int(n), int(r), int(p), len(key))
+            except ValueError:
+                ok = False
+            else:
+                ok = password is not None and hmac.compare_digest(candidate, key)
+        if not ok:
+            self.stats['failures'] += 1
+        return ok
+
+    def needs_rehash(self, stored):
+        """Returns True if stored is plaintext or was hashed with other parameters than the current ones."""
+        if not isinstance(stored, str) or not stored.startswith(SCHEME + '$'):
+            return True
+        parts = stored.split('$')
+        return len(parts) != 6 or parts[1:4] != [str(self.n), str(self.r), str(self.p)]
+
+    def _pool(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='kdf')
+        return self._executor
+
+    async def hash_async(self, password):
+        return await asyncio.get_running_loop().run_in_executor(self._pool(), self.hash, password)
+
+    async def verify_async(self, password, stored):
+        return await asyncio.get_running_loop().run_in_executor(self._pool(), self.verify, password, stored)
+
+    def hash_many(self, passwords):
+        """Hashes passwords in parallel on the pool, preserving order."""
+        return list(self._pool().map(self.hash, passwords))
+
+    def hasher_stats(self):
+        return dict(self.stats, n=self.n, r=self.r, p=self.p, workers=self.workers)
+
+
+def migrate_plaintext(store, hasher):
+    """Hashes every plaintext password in store. Returns the number of users migrated."""
+    users = [
+        user for user in store.all()
+        if isinstance(user.get('password'), str) and not user['password'].startswith(SCHEME + '$')
+    ]
+    hashes = hasher.hash_many([user['password'] for user in users])
+    for user, hashed in zip(users, hashes):
+        store.update(user['email'], {'password': hashed})
+    return len(users)
+
+
+if __name__ == "__main__":
+    # One-shot migration of plaintext passwords: python passwords.py
+    # (logins also migrate their own record, this just doesn't wait for them)
+    from main import password_hasher, user_store
+
+    migrated = migrate_plaintext(user_store, password_hasher)
+    print(f"Hashed {migrated} plaintext passwords in {user_store.db_path}")
@@ -0,0 +1,299 @@
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from prompts import normalize_question_types
+
+logger = logging.getLogger(__name__)
+
+
+def job_content_hash(title, description, skills):
+    """Hash of the job fields that go into a question prompt, whitespace-insensitive."""
+    payload = json.dumps([
+        ' '.join((title or '').split()),
+        ' '.join((description or '').split()),
+        [s.strip() for s in skills or []],
+    ], separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+def question_spec(num_questions, question_types):
+    """Canonical key of a question request's shape, e.g. '5:behavioral,situational,technical'."""
+    return '%d:%s' % (num_questions, ','.join(sorted(normalize_question_types(question_types))))
+
+
+class QuestionSetStore:
+    """Generated question sets in SQLite: the current version for each (job, spec).
+
+    Each row records the content hash of the job it was generated from and
+    a version number that goes up every time the set is regenerated. A
+    second table holds claims, so that when several workers share the
+    database only one of them generates each set.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS question_sets ("
+            "job_id TEXT NOT NULL, spec TEXT NOT NULL, content_hash TEXT NOT NULL, version INTEGER NOT NULL, "
+            "questions TEXT NOT NULL, generated_at REAL NOT NULL, PRIMARY KEY (job_id, spec))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS question_set_claims ("
+            "job_id TEXT NOT NULL, spec TEXT NOT NULL, content_hash TEXT NOT NULL, claimed_at REAL NOT NULL, "
+            "PRIMARY KEY (job_id, spec))"
+        )
+
+    def get(self, job_id, spec, content_hash):
+        """Returns the stored questions if they were generated from content_hash, else None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT questions FROM question_sets WHERE job_id = ? AND spec = ? AND content_hash = ?",
+                (job_id, spec, content_hash),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def claim(self, job_id, spec, content_hash, ttl):
+        """Claims generating the set for (job_id, spec) from content_hash for ttl seconds.
+
+        Returns 'claimed', 'stored' if that set already exists, or 'busy' if
+        another worker claimed it less than ttl seconds ago.
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if conn.execute(
+                    "SELECT 1 FROM question_sets WHERE job_id = ? AND spec = ? AND content_hash = ?",
+                    (job_id, spec, content_hash),
+                ).fetchone():
+                    result = 'stored'
+                elif conn.execute(
+                    "SELECT 1 FROM question_set_claims WHERE job_id = ? AND spec = ? AND content_hash = ? "
+                    "AND claimed_at > ?",
+                    (job_id, spec, content_hash, now - ttl),
+                ).fetchone():
+                    result = 'busy'
+                else:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO question_set_claims (job_id, spec, content_hash, claimed_at) "
+                        "VALUES (?, ?, ?, ?)",
+                        (job_id, spec, content_hash, now),
+                    )
+                    result = 'claimed'
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return result
+
+    def release(self, job_id, spec):
+        with self._lock:
+            self._conn.execute("DELETE FROM question_set_claims WHERE job_id = ? AND spec = ?", (job_id, spec))
+
+    def put(self, job_id, spec, content_hash, questions):
+        """Stores the set generated from content_hash and drops the claim on it."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO question_sets (job_id, spec, content_hash, version, questions, generated_at) "
+                "VALUES (?, ?, ?, 1, ?, ?) ON CONFLICT (job_id, spec) DO UPDATE SET "
+                "content_hash = excluded.content_hash, version = version + 1, "
+                "questions = excluded.questions, generated_at = excluded.generated_at",
+                (job_id, spec, content_hash, json.dumps(questions), time.time()),
+            )
+            self._conn.execute("DELETE FROM question_set_claims WHERE job_id = ? AND spec = ?", (job_id, spec))
+
+    def hashes(self, spec):
+        """Returns {job_id: content_hash} of every stored set for spec."""
+        with self._lock:
+            return dict(self._conn.execute("SELECT job_id, content_hash FROM question_sets WHERE spec = ?", (spec,)))
+
+    def delete(self, spec, job_ids):
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM question_sets WHERE job_id = ? AND spec = ?", [(job_id, spec) for job_id in job_ids]
+            )
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM question_sets").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class QuestionPrecomputer:
+    """Background asyncio workers keeping a question set for every catalog job in a QuestionSetStore.
+
+    After each catalog reload, reported by the catalog's listener, every job
+    is hashed and those whose hash differs from the stored set are queued.
+    The catalog is also refreshed every poll_interval seconds, so edits to
+    the jobs file are picked up without waiting for a request. Workers call
+    generate(job), at most concurrency at a time, and store the result.
+    Failed jobs are queued again after retry_delay.
+
+    Workers sharing the store claim each job in it before generating (see
+    QuestionSetStore.claim), so with several uvicorn workers each set is
+    generated once. A job claimed elsewhere is checked again after
+    claim_ttl, which is also how long a crashed worker's claim lasts.
+
+    The queue itself is not persisted: on start the catalog is diffed
+    against the store, so jobs a restart interrupted are queued again.
+    Only sets for one spec (num_questions, question_types) are precomputed.
+    """
+
+    def __init__(self, store, catalog, generate, num_questions, question_types,
+                 concurrency=1, poll_interval=10.0, retry_delay=60.0, claim_ttl=300.0):
+        self.store = store
+        self.catalog = catalog
+        self._generate = generate
+        self.num_questions = num_questions
+        self.question_types = list(question_types)
+        self.spec = question_spec(num_questions, question_types)
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+        self.claim_ttl = claim_ttl
+        # Hashing a large catalog and the SQLite writes stay off the event loop, one at a time
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='precompute')
+        # Lookups get their own thread, so requests never wait behind a catalog diff
+        self._lookup_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='precompute-lookup')
+        self._loop = None
+        self._queue = None
+        self._queued = set()
+        self._stored = {}
+        self._tasks = []
+        self.stats = {'queued': 0, 'generated': 0, 'failures': 0, 'removed': 0, 'claimed_elsewhere': 0,
+                      'hits': 0, 'misses': 0}
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._stored = await self._loop.run_in_executor(self._executor, self.store.hashes, self.spec)
+        self.catalog.add_listener(self._on_reload)
+        if not await self._loop.run_in_executor(self._executor, self.catalog.refresh):
+            # Already loaded before we started listening
+            self._schedule_diff()
+        self._tasks = [asyncio.ensure_future(self._poll())]
+        self._tasks += [asyncio.ensure_future(self._work()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def lookup(self, job_id, title, description, skills, num_questions, question_types):
+        """Returns the precomputed questions for this request, or None if they are missing or stale."""
+        if question_spec(num_questions, question_types) != self.spec:
+            return None
+        questions = await asyncio.get_running_loop().run_in_executor(
+            self._lookup_executor, self.store.get, str(job_id), self.spec, job_content_hash(title, description, skills)
+        )
+        self.stats['hits' if questions is not None else 'misses'] += 1
+        return questions
+
+    def _on_reload(self, catalog):
+        # Runs in whichever thread refreshed the catalog
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._schedule_diff)
+
+    def _schedule_diff(self):
+        # The workers update _stored on the loop thread, so the diff gets a snapshot
+        future = self._loop.run_in_executor(self._executor, self._diff, self.catalog.jobs, dict(self._stored))
+        future.add_done_callback(self._diffed)
+
+    def _diff(self, jobs, stored):
+        """Returns (changed, removed) job ids against stored, deleting the removed jobs' sets."""
+        current = {}
+        for job in jobs:
+            current[str(job.get('id'))] = job_content_hash(
+                job.get('title'), job.get('description'), job.get('required_skills')
+            )
+        removed = [job_id for job_id in stored if job_id not in current]
+        if removed:
+            self.store.delete(self.spec, removed)
+        changed = [job_id for job_id, content_hash in current.items() if stored.get(job_id) != content_hash]
+        return changed, removed
+
+    def _diffed(self, future):
+        try:
+            changed, removed = future.result()
+        except Exception as e:
+            logger.exception("Error diffing the job catalog: %s", e)
+            return
+        for job_id in removed:
+            self._stored.pop(job_id, None)
+        self.stats['removed'] += len(removed)
+        if changed:
+            logger.info("Queued %d jobs for question precomputation", len(changed))
+        self._enqueue(changed)
+
+    def _enqueue(self, job_ids):
+        for job_id in job_ids:
+            if job_id not in self._queued:
+                self._queued.add(job_id)
+                self._queue.put_nowait(job_id)
+                self.stats['queued'] += 1
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            await self._loop.run_in_executor(self._executor, self.catalog.refresh)
+
+    async def _work(self):
+        while True:
+            job_id = await self._queue.get()
+            self._queued.discard(job_id)
+            job = self.catalog.get(job_id)
+            if job is None:
+                continue
+            content_hash = job_content_hash(job.get('title'), job.get('description'), job.get('required_skills'))
+            if self._stored.get(job_id) == content_hash:
+                continue
+            claim = await self._loop.run_in_executor(
+                self._executor, self.store.claim, job_id, self.spec, content_hash, self.claim_ttl
+            )
+            if claim == 'stored':
+                self._stored[job_id] = content_hash
+                continue
+            if claim == 'busy':
+                # Another worker is generating it; look again once its claim would have expired
+                self.stats['claimed_elsewhere'] += 1
+                self._loop.call_later(self.claim_ttl, self._enqueue, [job_id])
+                continue
+            try:
+                with metrics.stage('precompute'):
+                    questions = await self._generate(job)
+                await self._loop.run_in_executor(
+                    self._executor, self.store.put, job_id, self.spec, content_hash, questions
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats['failures'] += 1
+                try:
+                    # Whichever worker retries first may claim it again
+                    await self._loop.run_in_executor(self._executor, self.store.release, job_id, self.spec)
+                except Exception as release_error:
+                    logger.exception("Error releasing a question precomputation claim: %s", release_error)
+                logger.warning("Question precomputation failed, retrying in %ss: %r", self.retry_delay, e,
+                               extra={'job_id': job_id})
+                self._loop.call_later(self.retry_delay, self._enqueue, [job_id])
+                continue
+            self._stored[job_id] = content_hash
+            self.stats['generated'] += 1
+
+    def precompute_stats(self):
+        return dict(self.stats, pending=self._queue.qsize() if self._queue else 0, stored=len(self._stored))
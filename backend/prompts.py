@@ -0,0 +1,142 @@
+import re
+import textwrap
+from string import Formatter
+
+# Instructions shared by every question prompt. They are sent once as the
+# model's system instruction instead of being repeated in each prompt.
+SYSTEM_INSTRUCTION = textwrap.dedent("""\
+    You are an expert HR professional preparing job interviews.
+    Every question must be completely different from the others in topic and approach; never repeat or rephrase one.
+    Start with a general introduction/background question, then go from general to specific.
+    Make questions specific to the role and ask about each required skill at least once.
+    Answer with JSON only, without markdown or any other text.""")
+
+QUESTION_TYPES = {
+    'technical': "technical questions about specific skills",
+    'behavioral': "behavioral questions about past experiences",
+    'situational': "situational questions about hypothetical scenarios",
+    'problem-solving': "problem-solving questions",
+    'leadership': "leadership and teamwork questions",
+}
+
+_TYPE_ALIASES = {
+    'behavioural': 'behavioral',
+    'problem solving': 'problem-solving',
+    'problem_solving': 'problem-solving',
+    'problemsolving': 'problem-solving',
+    'teamwork': 'leadership',
+    'leadership and teamwork': 'leadership',
+}
+
+_SENTENCE_END = re.compile(r'[.!?]\s')
+
+
+class PromptTemplate:
+    """A str.format-style template split into literal text and field names once, at import.
+
+    render() only joins the precompiled literals with the field values.
+    """
+
+    def __init__(self, template):
+        self._parts = []
+        for literal, field, spec, conversion in Formatter().parse(textwrap.dedent(template).strip()):
+            if spec or conversion:
+                raise ValueError("PromptTemplate fields take no format spec or conversion")
+            self._parts.append((literal, field))
+
+    def render(self, **values):
+        out = []
+        for literal, field in self._parts:
+            out.append(literal)
+            if field is not None:
+                out.append(str(values[field]))
+        return ''.join(out)
+
+
+QUESTION_TEMPLATE = PromptTemplate("""
+    Job: {title}
+    Description: {description}
+    Required skills: {skills}
+
+    Write {count} interview questions for this job, covering {types}.
+    Return a JSON array of {count} strings, e.g. ["Question 1?", "Question 2?"].
+""")
+
+BATCH_JOB_TEMPLATE = PromptTemplate("""
+    Job ID: {job_id}
+    Job: {title}
+    Description: {description}
+    Required skills: {skills}
+""")
+
+BATCH_TEMPLATE = PromptTemplate("""
+    {jobs}
+
+    For each job above, write {count} interview questions specific to that job, covering {types}.
+    Return a JSON object mapping each Job ID to a JSON array of strings, e.g. {{"{example_id}": ["Question 1?", "Question 2?"]}}.
+""")
+
+
+def normalize_question_types(question_types):
+    """Maps requested question types to known QUESTION_TYPES keys, in request order; unknown types are dropped."""
+    types = []
+    for question_type in question_types or []:
+        key = ' '.join(str(question_type).strip().lower().split())
+        key = _TYPE_ALIASES.get(key, key)
+        if key in QUESTION_TYPES and key not in types:
+            types.append(key)
+    return types
+
+
+def describe_types(question_types):
+    types = normalize_question_types(question_types) or list(QUESTION_TYPES)
+    descriptions = [QUESTION_TYPES[t] for t in types]
+    if len(descriptions) == 1:
+        return descriptions[0]
+    return ', '.join(descriptions[:-1]) + ' and ' + descriptions[-1]
+
+
+def trim_to_tokens(text, max_tokens, chars_per_token=4):
+    """Shortens text to roughly max_tokens tokens, ending on a sentence or word boundary.
+
+    Tokens are estimated as chars_per_token characters each, which is close
+    for English text and needs no tokenizer round trip.
+    """
+    text = ' '.join((text or '').split())
+    budget = max_tokens * chars_per_token
+    if len(text) <= budget:
+        return text
+    cut = text[:budget]
+    ends = [m.end() for m in _SENTENCE_END.finditer(cut)]
+    if ends and ends[-1] > budget // 2:
+        return cut[:ends[-1]].rstrip()
+    return cut.rsplit(' ', 1)[0] + ' ...'
+
+
+class PromptBuilder:
+    """Renders question prompts with job descriptions trimmed to description_tokens."""
+
+    def __init__(self, description_tokens=300):
+        self.description_tokens = description_tokens
+
+    def _job_fields(self, title, description, skills):
+        return {
+            'title': title or 'Not specified',
+            'description': trim_to_tokens(description, self.description_tokens) or 'Not specified',
+            'skills': ', '.join(skills) if skills else 'Not specified',
+        }
+
+    def question_prompt(self, title, description, skills, count, question_types):
+        return QUESTION_TEMPLATE.render(
+            count=count, types=describe_types(question_types), **self._job_fields(title, description, skills)
+        )
+
+    def batch_prompt(self, jobs, count, question_types):
+        """jobs is a list of (job_id, title, description, skills)."""
+        blocks = '\n\n'.join(
+            BATCH_JOB_TEMPLATE.render(job_id=job_id, **self._job_fields(title, description, skills))
+            for job_id, title, description, skills in jobs
+        )
+        return BATCH_TEMPLATE.render(
+            jobs=blocks, count=count, types=describe_types(question_types), example_id=jobs[0][0]
+        )
@@ -0,0 +1,323 @@
+import functools
+import json
+import operator
+import random
+import re
+import string
+
+# List markers stripped from the start of lines in non-JSON output
+_LIST_MARKER = '1234567890.- '
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+# NormalizedTokenDetector's word breaks: ASCII punctuation and whitespace go
+# through a bytes table, typographic quotes and dashes through a str table first
+_BREAKS = string.punctuation + '\t\n\r\x0b\x0c'
+_WORD_BREAKS = bytes.maketrans(_BREAKS.encode(), b' ' * len(_BREAKS))
+_UNICODE_BREAKS = str.maketrans({c: ' ' for c in '\u2018\u2019\u201c\u201d\u2013\u2014\u2026\u00bf\u00a1'})
+_SPACES = re.compile(rb'  +')
+
+_MERSENNE_PRIME = (1 << 61) - 1
+
+# Inside a streamed JSON array: a complete string, the closing bracket, or
+# the opening quote of a string that is still arriving
+_ARRAY_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"|\]|"')
+
+
+def clean_question(question):
+    """Returns question without surrounding whitespace and JSON artifacts, or '' if nothing is left."""
+    if not isinstance(question, str):
+        return ''
+    # Chained replace() beats translate() here: it is a no-op copy-free scan when nothing matches
+    return question.replace('[', '').replace(']', '').replace('{', '').replace('}', '').strip()
+
+
+def clean_questions(questions):
+    """Strips whitespace and leftover JSON artifacts and drops empty questions."""
+    return [q for q in map(clean_question, questions) if q]
+
+
+def _strip_code_fence(text):
+    text = text.strip()
+    if text.startswith('```'):
+        text = text[3:]
+        if text.startswith('json'):
+            text = text[4:]
+        if text.endswith('```'):
+            text = text[:-3]
+        text = text.strip()
+    return text
+
+
+def parse_questions(questions_text):
+    """Extracts a list of questions from raw model output.
+
+    A JSON array (optionally inside a markdown code fence or surrounded by
+    chatter) is decoded in one call, a broken one keeps its complete strings,
+    and anything else is split into lines with list markers removed.
+    """
+    text = _strip_code_fence(questions_text)
+    start, end = text.find('['), text.rfind(']')
+    if start != -1 and end > start:
+        # Tolerate chatter before or after the array
+        try:
+            questions = json.loads(text[start:end + 1])
+        except json.JSONDecodeError:
+            questions = None
+        if isinstance(questions, list):
+            return clean_questions(questions)
+
+    if start != -1:
+        # A truncated or broken array: keep the strings that did complete
+        salvaged = clean_questions(IncrementalQuestionParser().feed(text[start:]))
+        if salvaged:
+            return salvaged
+
+    questions = []
+    for line in questions_text.splitlines():
+        line = line.strip()
+        if not line or line.startswith('```'):
+            continue
+        question = clean_question(line.lstrip(_LIST_MARKER).strip().strip('",'))
+        if question:
+            questions.append(question)
+    return questions
+
+
+class ExactDetector:
+    """Treats questions as duplicates only if they are identical strings."""
+
+    def __init__(self):
+        self._seen = set()
+
+    def seen(self, question):
+        """Returns True if question duplicates an earlier one, otherwise records it."""
+        if question in self._seen:
+            return True
+        self._seen.add(question)
+        return False
+
+    def seen_each(self, questions):
+        """Lazily applies seen() to each question in turn."""
+        return map(self.seen, questions)
+
+
+def _normalized_keys(questions):
+    """Returns each question's lower-cased words, space-separated, as bytes.
+
+    All questions are normalized together: joined with NUL separators, they
+    go through one lower(), one bytes.translate() and one regex pass, which
+    costs far less than a regex or str.translate() per question.
+    """
+    text = ('\x00 ' + ' \x00 '.join(questions) + ' \x00').lower()
+    if not text.isascii():
+        text = text.translate(_UNICODE_BREAKS)
+    keys = _SPACES.sub(b' ', text.encode().translate(_WORD_BREAKS)).split(b'\x00')[1:-1]
+    if len(keys) != len(questions):
+        # A question contained the separator
+        return [_normalized_keys([question.replace('\x00', ' ')])[0] for question in questions]
+    return keys
+
+
+class NormalizedTokenDetector:
+    """Treats questions as duplicates if they have the same words, ignoring case and punctuation."""
+
+    def __init__(self):
+        self._seen = set()
+
+    def _seen_key(self, key):
+        if key in self._seen:
+            return True
+        self._seen.add(key)
+        return False
+
+    def seen(self, question):
+        return self._seen_key(_normalized_keys([question])[0])
+
+    def seen_each(self, questions):
+        """Lazily applies seen() to each question in turn, normalizing them all up front."""
+        return map(self._seen_key, _normalized_keys(questions))
+
+
+@functools.lru_cache(maxsize=None)
+def _permutations(num_perm):
+    rng = random.Random(0)
+    return [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME)) for _ in range(num_perm)]
+
+
+class MinHashDetector:
+    """Treats questions as duplicates if their word shingles are similar enough.
+
+    Each question gets a MinHash signature over its word shingles; the
+    signature is split into bands and banded buckets find candidate matches
+    in O(1), whose estimated Jaccard similarity is then compared to threshold.
+    Signatures only need to be comparable within one detector, so shingles
+    are hashed with the built-in hash().
+    """
+
+    def __init__(self, threshold=0.7, num_perm=16, bands=4, shingle_size=2):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self._permutations = _permutations(num_perm)
+        self._buckets = {}
+        self._signatures = []
+
+    def _signature(self, question):
+        tokens = _TOKEN.findall(question.lower())
+        n = self.shingle_size
+        hashes = {hash(tuple(tokens[i:i + n])) & _MERSENNE_PRIME for i in range(max(1, len(tokens) - n + 1))}
+        # Permutation i maps a shingle hash h to (a_i * h + b_i) mod p
+        return [min([(a * h + b) % _MERSENNE_PRIME for h in hashes]) for a, b in self._permutations]
+
+    def seen(self, question):
+        signature = self._signature(question)
+        r = self.rows
+        bands = [(b, tuple(signature[b * r:(b + 1) * r])) for b in range(self.bands)]
+        candidates = set()
+        for band in bands:
+            candidates.update(self._buckets.get(band, ()))
+        needed = self.threshold * self.num_perm
+        for idx in candidates:
+            if sum(map(operator.eq, signature, self._signatures[idx])) >= needed:
+                return True
+        idx = len(self._signatures)
+        self._signatures.append(signature)
+        for band in bands:
+            self._buckets.setdefault(band, []).append(idx)
+        return False
+
+    def seen_each(self, questions):
+        return map(self.seen, questions)
+
+
+DETECTORS = {
+    'exact': ExactDetector,
+    'normalized': NormalizedTokenDetector,
+    'minhash': MinHashDetector,
+}
+
+
+class IncrementalQuestionParser:
+    """Pulls complete strings out of a JSON array of strings as it streams in.
+
+    feed() takes the next chunk of model output and returns the questions
+    whose closing quote arrived in it. Anything before the opening bracket,
+    such as a markdown code fence, is skipped. If the output turns out not to
+    be a JSON array, saw_array stays False and text holds everything fed so
+    far for a non-streaming fallback parse.
+    """
+
+    def __init__(self):
+        self.text = ''
+        self.saw_array = False
+        self._pos = 0
+        self._done = False
+
+    def feed(self, chunk):
+        self.text += chunk
+        if self._done:
+            return []
+        text = self.text
+        if not self.saw_array:
+            start = text.find('[', self._pos)
+            if start == -1:
+                self._pos = len(text)
+                return []
+            self.saw_array = True
+            self._pos = start + 1
+
+        questions = []
+        for match in _ARRAY_TOKEN.finditer(text, self._pos):
+            token = match.group()
+            if token == ']':
+                self._done = True
+                break
+            if token == '"':
+                # Start of a string whose closing quote hasn't arrived yet
+                self._pos = match.start()
+                return questions
+            try:
+                questions.append(json.loads(token))
+            except json.JSONDecodeError:
+                pass
+            self._pos = match.end()
+        else:
+            self._pos = len(text)
+        return questions
+
+
+class QuestionCollector:
+    """Applies the dedup, trim and default-padding rules one question at a time.
+
+    add() accepts a cleaned question and returns True if it was kept; pad()
+    returns the default questions needed to reach num_questions, skipping any
+    that overlap a kept question. detector decides what counts as a duplicate
+    and is one of the DETECTORS names.
+
+    Measured with benchmarks/postprocess.py: 'exact' matches the old
+    pipeline's results and cost. 'normalized' also catches questions that
+    differ only in case or punctuation, at about +6us on a 5-question answer
+    (~19us vs ~13us) and +15% on 500 questions. 'minhash' costs 40-50x more
+    (~48ms per 500 questions) and keeps only about a third of the synthetic
+    500, since template-built questions share most word pairs.
+    """
+
+    def __init__(self, num_questions, default_questions, detector='exact'):
+        self.num_questions = num_questions
+        self.default_questions = default_questions
+        self.questions = []
+        self.duplicates = 0
+        self._detector = DETECTORS[detector]()
+        self._seen = self._detector.seen
+
+    @property
+    def full(self):
+        return len(self.questions) >= self.num_questions
+
+    def add(self, question):
+        if len(self.questions) >= self.num_questions:
+            return False
+        if self._seen(question):
+            self.duplicates += 1
+            return False
+        self.questions.append(question)
+        return True
+
+    def extend(self, questions):
+        """Adds questions in order until the collector is full."""
+        kept, limit = self.questions, self.num_questions
+        if len(kept) >= limit:
+            return
+        # seen_each() is lazy, so questions after the collector fills are never recorded
+        for question, duplicate in zip(questions, self._detector.seen_each(questions)):
+            if duplicate:
+                self.duplicates += 1
+                continue
+            kept.append(question)
+            if len(kept) >= limit:
+                break
+
+    def pad(self):
+        if self.full:
+            return []
+        # Defaults overlapping a kept question, either way round, are skipped;
+        # one joined string answers "default inside a kept question" in a single scan.
+        lowered = [q.lower() for q in self.questions]
+        joined = '\x00'.join(lowered)
+        candidates = []
+        for q in self.default_questions:
+            default = q.lower()
+            if not (default in joined or any(len(e) <= len(default) and e in default for e in lowered)):
+                candidates.append(q)
+        added = []
+        for q, duplicate in zip(candidates, self._detector.seen_each(candidates)):
+            if duplicate:
+                continue
+            self.questions.append(q)
+            added.append(q)
+            if self.full:
+                break
+        return added
@@ -0,0 +1,362 @@
+import bisect
+import math
+import re
+import threading
+from array import array
+
+import numpy as np
+
+# Searchable fields and their weights; a title word counts as much as three description words
+JOB_FIELDS = {'title': 3.0, 'required_skills': 2.0, 'company': 1.0, 'location': 1.0, 'description': 1.0}
+SEEKER_FIELDS = {'job_title': 3.0, 'skills': 2.0, 'location': 1.0, 'name': 1.0}
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Score multipliers for query words matched by prefix (autocomplete) or with one typo
+PREFIX_WEIGHT = 0.8
+FUZZY_WEIGHT = 0.6
+MIN_PREFIX_LENGTH = 2
+MIN_FUZZY_LENGTH = 4
+MAX_EXPANSIONS = 50
+
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9+#]+)*")
+
+
+def tokenize(text):
+    """Lower-cased words of text, keeping tokens like c++, c# and node.js whole."""
+    return _TOKEN.findall(text.lower()) if text else []
+
+
+def _field_text(value):
+    if isinstance(value, (list, tuple)):
+        return ' '.join(str(v) for v in value)
+    return str(value) if value is not None else ''
+
+
+def _deletes(term):
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+def _within_one_edit(a, b):
+    """True if a and b differ by at most one insertion, deletion, substitution or adjacent transposition."""
+    if a == b:
+        return True
+    la, lb = len(a), len(b)
+    if abs(la - lb) > 1:
+        return False
+    i = 0
+    while i < min(la, lb) and a[i] == b[i]:
+        i += 1
+    if la == lb:
+        if a[i + 1:] == b[i + 1:]:
+            return True
+        return i + 1 < la and a[i] == b[i + 1] and a[i + 1] == b[i] and a[i + 2:] == b[i + 2:]
+    if la > lb:
+        return a[i + 1:] == b[i:]
+    return a[i:] == b[i + 1:]
+
+
+class _Array:
+    """Growable numpy array, doubling its capacity as it fills."""
+
+    __slots__ = ('_data', '_size')
+
+    def __init__(self, dtype):
+        self._data = np.empty(16, dtype=dtype)
+        self._size = 0
+
+    def append(self, value):
+        if self._size == len(self._data):
+            grown = np.empty(len(self._data) * 2, dtype=self._data.dtype)
+            grown[:self._size] = self._data[:self._size]
+            self._data = grown
+        self._data[self._size] = value
+        self._size += 1
+
+    def view(self):
+        return self._data[:self._size]
+
+
+class _Postings:
+    """Rows containing a term and the term's weighted frequency in each.
+
+    Appends go to compact array.array buffers and are folded into the numpy
+    arrays on the next read, so bulk indexing never touches numpy per document.
+    """
+
+    __slots__ = ('rows', 'tfs', '_rows', '_tfs')
+
+    def __init__(self):
+        self.rows = np.empty(0, dtype=np.int32)
+        self.tfs = np.empty(0, dtype=np.float32)
+        self._rows = array('i')
+        self._tfs = array('f')
+
+    def append(self, row, tf):
+        self._rows.append(row)
+        self._tfs.append(tf)
+
+    def __len__(self):
+        return len(self.rows) + len(self._rows)
+
+    def arrays(self):
+        if self._rows:
+            self.rows = np.concatenate((self.rows, np.frombuffer(self._rows, dtype=np.int32)))
+            self.tfs = np.concatenate((self.tfs, np.frombuffer(self._tfs, dtype=np.float32)))
+            self._rows = array('i')
+            self._tfs = array('f')
+        return self.rows, self.tfs
+
+
+class _Corpus:
+    """An inverted index over one kind of document, with BM25 statistics.
+
+    Documents are only appended. Replacing or removing one marks its row
+    dead; dead rows are left out of results and of document frequencies,
+    and stay in the posting arrays until the corpus is rebuilt (see
+    fragmented()).
+    """
+
+    def __init__(self, fields):
+        self.fields = fields
+        self.keys = []
+        self.rows = {}
+        self.fingerprints = {}
+        self.alive = _Array(np.bool_)
+        self.lengths = _Array(np.float32)
+        self.postings = {}
+        self.live = 0
+        self.total_length = 0.0
+        # Sorted vocabulary for prefix lookups, and one-deletion variants -> terms for typo lookups
+        self._vocabulary = []
+        self._new_terms = []
+        self.variants = {}
+
+    def texts(self, doc):
+        return tuple(_field_text(doc.get(field)) for field in self.fields)
+
+    def add(self, key, doc, texts=None):
+        """Indexes doc under key, replacing any earlier version. Returns False if it was unchanged."""
+        texts = texts or self.texts(doc)
+        # Only a hash of the searchable text is kept, to spot changed documents
+        fingerprint = hash(texts)
+        if self.fingerprints.get(key) == fingerprint:
+            return False
+        self.remove(key)
+        tfs = {}
+        for text, weight in zip(texts, self.fields.values()):
+            for term in tokenize(text):
+                tfs[term] = tfs.get(term, 0.0) + weight
+        row = len(self.keys)
+        self.keys.append(key)
+        self.rows[key] = row
+        self.fingerprints[key] = fingerprint
+        length = sum(tfs.values())
+        self.alive.append(True)
+        self.lengths.append(length)
+        self.live += 1
+        self.total_length += length
+        for term, tf in tfs.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = _Postings()
+                self._new_terms.append(term)
+                for variant in _deletes(term) | {term}:
+                    self.variants.setdefault(variant, []).append(term)
+            postings.append(row, tf)
+        return True
+
+    def remove(self, key):
+        row = self.rows.pop(key, None)
+        if row is None:
+            return False
+        del self.fingerprints[key]
+        self.alive.view()[row] = False
+        self.live -= 1
+        self.total_length -= float(self.lengths.view()[row])
+        return True
+
+    def fragmented(self):
+        """True once more than half of the rows are dead, when rebuilding beats filtering them out."""
+        return len(self.keys) > 2 * max(self.live, 1)
+
+    def vocabulary(self):
+        """All terms in sorted order; terms added since the last call are merged in first."""
+        if self._new_terms:
+            if len(self._new_terms) < 1000:
+                for term in self._new_terms:
+                    bisect.insort(self._vocabulary, term)
+            else:
+                self._vocabulary = sorted(self.postings)
+            self._new_terms = []
+        return self._vocabulary
+
+    def expand(self, word, last):
+        """Returns {term: weight} for a query word: the word itself, prefix completions and one-typo variants."""
+        terms = {}
+        if word in self.postings:
+            terms[word] = 1.0
+        if last and len(word) >= MIN_PREFIX_LENGTH:
+            vocabulary = self.vocabulary()
+            i = bisect.bisect_left(vocabulary, word)
+            for term in vocabulary[i:i + MAX_EXPANSIONS]:
+                if not term.startswith(word):
+                    break
+                terms.setdefault(term, PREFIX_WEIGHT)
+        if not terms and len(word) >= MIN_FUZZY_LENGTH:
+            candidates = set()
+            for variant in _deletes(word) | {word}:
+                candidates.update(self.variants.get(variant, ()))
+            for term in sorted(candidates)[:MAX_EXPANSIONS]:
+                if _within_one_edit(word, term):
+                    terms[term] = FUZZY_WEIGHT
+        return terms
+
+    def search(self, query, k):
+        """Returns [(key, score)] of the k best BM25 matches for query, best first."""
+        words = tokenize(query)
+        if not words or not self.live:
+            return []
+        n = len(self.keys)
+        avg_length = self.total_length / self.live
+        lengths = self.lengths.view()
+        alive = self.alive.view() if self.live < n else None
+        scores = np.zeros(n, dtype=np.float32)
+        for i, word in enumerate(words):
+            expansions = self.expand(word, i == len(words) - 1)
+            # A word counts once per document, by its best-scoring expansion
+            word_scores = scores if len(expansions) == 1 else np.zeros(n, dtype=np.float32)
+            for term, weight in expansions.items():
+                rows, tfs = self.postings[term].arrays()
+                df = len(rows) if alive is None else int(np.count_nonzero(alive[rows]))
+                idf = math.log(1.0 + (self.live - df + 0.5) / (df + 0.5))
+                norm = K1 * (1.0 - B + B * lengths[rows] / avg_length)
+                contribution = (weight * idf) * tfs * (K1 + 1.0) / (tfs + norm)
+                if word_scores is scores:
+                    # Rows are unique within a posting list, so this adds once per document
+                    scores[rows] += contribution
+                else:
+                    word_scores[rows] = np.maximum(word_scores[rows], contribution)
+            if len(expansions) > 1:
+                scores += word_scores
+        # nonzero() on a bool mask is several times faster than on the float scores
+        hits = np.flatnonzero(scores > 0)
+        if alive is not None:
+            hits = hits[alive[hits]]
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        # Best first; equal scores in indexing order
+        hits = hits[np.lexsort((hits, -scores[hits]))]
+        return [(self.keys[row], float(scores[row])) for row in hits]
+
+
+class SearchIndex:
+    """Full-text search over jobs and seekers, ranked with BM25.
+
+    Each kind has its own inverted index from term to numpy arrays of rows and
+    weighted term frequencies (field weights are in JOB_FIELDS and
+    SEEKER_FIELDS). A query word also matches terms it is a prefix of, when
+    it is the last word (autocomplete), and terms one typo away when nothing
+    else matches, each at a discount. Scoring is a few vectorized passes over
+    the posting arrays of the matched terms.
+
+    Seekers are added one by one as they sign up or change, through
+    update_seekers(); sync_jobs() re-indexes only the jobs whose searchable
+    fields changed since the last sync.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.jobs = _Corpus(JOB_FIELDS)
+        self.seekers = _Corpus(SEEKER_FIELDS)
+
+    def add_seeker(self, user):
+        if user.get('role') != 'seeker' or not user.get('email'):
+            return
+        with self._lock:
+            self.seekers.add(user['email'], user)
+
+    def update_seekers(self, users):
+        """Re-indexes the given new or changed users, dropping any that are no longer seekers.
+
+        Returns True once most seeker rows are dead, when the caller should
+        rebuild_seekers() from every user.
+        """
+        with self._lock:
+            corpus = self.seekers
+            for user in users:
+                if not user.get('email'):
+                    continue
+                if user.get('role') == 'seeker':
+                    corpus.add(user['email'], user)
+                else:
+                    corpus.remove(user['email'])
+            return corpus.fragmented()
+
+    def rebuild_seekers(self, users):
+        corpus = _Corpus(SEEKER_FIELDS)
+        for user in users:
+            if user.get('role') == 'seeker' and user.get('email'):
+                corpus.add(user['email'], user)
+        with self._lock:
+            self.seekers = corpus
+
+    def rebuild_jobs(self, jobs):
+        corpus = _Corpus(JOB_FIELDS)
+        for job in jobs:
+            if job.get('id') is not None:
+                corpus.add(str(job['id']), job)
+        with self._lock:
+            self.jobs = corpus
+
+    def sync_jobs(self, jobs):
+        """Brings the job index in line with jobs, re-indexing only added, changed and removed jobs.
+
+        Returns the number of jobs re-indexed or removed. Falls back to a full
+        rebuild once more than half of the indexed rows are dead.
+        """
+        with self._lock:
+            corpus = self.jobs
+            if corpus.fragmented():
+                corpus = None
+        if corpus is None:
+            self.rebuild_jobs(jobs)
+            return len(jobs)
+        changed = 0
+        seen = set()
+        for job in jobs:
+            if job.get('id') is None:
+                continue
+            key = str(job['id'])
+            seen.add(key)
+            texts = corpus.texts(job)
+            if corpus.fingerprints.get(key) != hash(texts):
+                with self._lock:
+                    changed += corpus.add(key, job, texts)
+        with self._lock:
+            for key in [key for key in corpus.rows if key not in seen]:
+                changed += corpus.remove(key)
+        return changed
+
+    def search_jobs(self, query, k=10):
+        """Returns [(job_id, score)] of the k best matching jobs."""
+        with self._lock:
+            return self.jobs.search(query, k)
+
+    def search_seekers(self, query, k=10):
+        """Returns [(email, score)] of the k best matching seekers."""
+        with self._lock:
+            return self.seekers.search(query, k)
+
+    def index_stats(self):
+        with self._lock:
+            return {
+                'jobs': self.jobs.live,
+                'job_rows': len(self.jobs.keys),
+                'job_terms': len(self.jobs.postings),
+                'seekers': self.seekers.live,
+                'seeker_rows': len(self.seekers.keys),
+                'seeker_terms': len(self.seekers.postings),
+            }
@@ -0,0 +1,186 @@
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from collections.abc import Mapping, Sequence
+
+MAGIC = b'JBSNAP01'
+
+# magic, record count, field count
+_HEADER = struct.Struct('<8sII')
+# per field: byte offset of its offsets array and of its value blob
+_COLUMN = struct.Struct('<QQ')
+_NAME_LEN = struct.Struct('<H')
+
+# Each stored value starts with a tag byte: str is stored as raw UTF-8,
+# anything else as compact JSON. A zero-length value means the field is absent.
+_STR = b's'
+_JSON = b'j'
+
+
+def _encode(value):
+    if isinstance(value, str):
+        return _STR + value.encode('utf-8')
+    return _JSON + json.dumps(value, separators=(',', ':')).encode('utf-8')
+
+
+def write_snapshot(path, records):
+    """Writes records (a sequence of dicts) to path in the columnar snapshot format, atomically.
+
+    Layout: header, field names, one (offsets, blob) directory entry per field,
+    then per field an array of count + 1 uint32 offsets into its blob of
+    encoded values, so value i of a field is blob[offsets[i]:offsets[i + 1]].
+    """
+    fields = list(dict.fromkeys(field for record in records for field in record))
+    count = len(records)
+    columns = []
+    for field in fields:
+        offsets, parts, size = [0], [], 0
+        for record in records:
+            if field in record:
+                encoded = _encode(record[field])
+                parts.append(encoded)
+                size += len(encoded)
+            offsets.append(size)
+        if size >= 2 ** 32:
+            raise ValueError(f"Column {field!r} is too large for a snapshot")
+        columns.append((struct.pack(f'<{count + 1}I', *offsets), b''.join(parts)))
+
+    head = _HEADER.pack(MAGIC, count, len(fields))
+    for field in fields:
+        name = field.encode('utf-8')
+        head += _NAME_LEN.pack(len(name)) + name
+    pos = len(head) + _COLUMN.size * len(fields)
+    directory, body = b'', []
+    for offsets, blob in columns:
+        # Keep every offsets array 4-byte aligned
+        padding = -pos % 4
+        body.append(b'\0' * padding)
+        pos += padding
+        directory += _COLUMN.pack(pos, pos + len(offsets))
+        body += [offsets, blob]
+        pos += len(offsets) + len(blob)
+
+    directory_name = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory_name, prefix='.' + os.path.basename(path) + '-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(head)
+            f.write(directory)
+            for chunk in body:
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class Snapshot(Sequence):
+    """Read-only, memory-mapped view of a snapshot file.
+
+    Opening a snapshot reads only the header; records are SnapshotRecord
+    views that decode a field the first time it's looked up, so a catalog
+    index over three fields never decodes the others. The file's pages are
+    shared with the OS page cache instead of living on the Python heap.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._mmap)
+        magic, count, num_fields = _HEADER.unpack_from(buf, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a snapshot file")
+        pos = _HEADER.size
+        self.fields = []
+        for _ in range(num_fields):
+            (length,) = _NAME_LEN.unpack_from(buf, pos)
+            pos += _NAME_LEN.size
+            self.fields.append(bytes(buf[pos:pos + length]).decode('utf-8'))
+            pos += length
+        self._count = count
+        self._columns = {}
+        for field in self.fields:
+            offsets_pos, blob_pos = _COLUMN.unpack_from(buf, pos)
+            pos += _COLUMN.size
+            offsets = buf[offsets_pos:blob_pos].cast('I')
+            if sys.byteorder != 'little':
+                offsets = list(struct.unpack(f'<{count + 1}I', offsets.tobytes()))
+            self._columns[field] = (offsets, blob_pos)
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [SnapshotRecord(self, i) for i in range(*row.indices(self._count))]
+        if row < 0:
+            row += self._count
+        if not 0 <= row < self._count:
+            raise IndexError(row)
+        return SnapshotRecord(self, row)
+
+    def value(self, row, field, default=None):
+        """Decodes one field of one record."""
+        column = self._columns.get(field)
+        if column is None:
+            return default
+        offsets, blob_pos = column
+        start, end = offsets[row], offsets[row + 1]
+        if start == end:
+            return default
+        raw = self._mmap[blob_pos + start:blob_pos + end]
+        if raw[:1] == _STR:
+            return raw[1:].decode('utf-8')
+        return json.loads(raw[1:])
+
+    def has(self, row, field):
+        column = self._columns.get(field)
+        return column is not None and column[0][row] != column[0][row + 1]
+
+    def column(self, field):
+        """Decodes one field of every record; None where it is absent."""
+        return [self.value(row, field) for row in range(self._count)]
+
+
+class SnapshotRecord(Mapping):
+    """One record of a Snapshot; a read-only mapping whose values are decoded on access."""
+
+    __slots__ = ('_snapshot', '_row')
+
+    def __init__(self, snapshot, row):
+        self._snapshot = snapshot
+        self._row = row
+
+    def __getitem__(self, field):
+        snapshot = self._snapshot
+        if not snapshot.has(self._row, field):
+            raise KeyError(field)
+        return snapshot.value(self._row, field)
+
+    def get(self, field, default=None):
+        return self._snapshot.value(self._row, field, default)
+
+    def __iter__(self):
+        return (field for field in self._snapshot.fields if self._snapshot.has(self._row, field))
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"SnapshotRecord({dict(self)!r})"
+
+
+if __name__ == "__main__":
+    # Convert a JSON list to a snapshot: python snapshot.py jobs.json jobs.snap
+    source, target = sys.argv[1:3]
+    with open(source) as f:
+        records = json.load(f)
+    write_snapshot(target, records)
+    print(f"Wrote {len(records)} records to {target} ({os.path.getsize(target)} bytes, "
+          f"{os.path.getsize(source)} as JSON)")
@@ -0,0 +1,157 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+_HEADER = {'alg': 'HS256', 'typ': 'JWT'}
+
+
+class TokenError(Exception):
+    """Raised for a missing, malformed, expired, revoked or wrongly signed token."""
+
+    code = 'token_not_valid'
+
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def load_or_create_secret(path):
+    """Returns the secret stored at path, creating the file with a random secret if it is missing.
+
+    The file is written under a temporary name and hard-linked into place,
+    which fails if another worker got there first, so every process sharing
+    path ends up with the same secret. mkstemp makes it readable by the owner only.
+    """
+    if not os.path.exists(path):
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path) + '-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(secrets.token_hex(32))
+                f.flush()
+                os.fsync(f.fileno())
+            os.link(tmp_path, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(tmp_path)
+    with open(path) as f:
+        secret = f.read().strip()
+    if not secret:
+        raise ValueError(f"Token secret file {path} is empty")
+    return secret
+
+
+class TokenIssuer:
+    """Issues and verifies HS256 JWT access and refresh tokens.
+
+    Tokens carry the user's email, name and role, so a valid token answers
+    "who is this" without a user lookup. Decoded tokens are kept in an LRU of
+    cache_size entries: a repeat check is one dict lookup plus the expiry and
+    revocation checks, and the HMAC is only computed the first time a token is
+    seen. Revoked token ids are kept until the token would have expired anyway.
+
+    Revocations live in this process only; with several workers a revoked token
+    stays valid on the others until it expires, which access_ttl bounds.
+    """
+
+    def __init__(self, secret, access_ttl=15 * 60, refresh_ttl=7 * 24 * 3600, cache_size=4096):
+        self._key = secret.encode('utf-8') if isinstance(secret, str) else secret
+        self._header = _b64encode(json.dumps(_HEADER, separators=(',', ':')).encode())
+        self.access_ttl = access_ttl
+        self.refresh_ttl = refresh_ttl
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._decoded = OrderedDict()
+        self._revoked = {}
+        self.stats = {'issued': 0, 'hits': 0, 'misses': 0, 'invalid': 0, 'revoked': 0}
+
+    def _sign(self, signing_input):
+        return _b64encode(hmac.new(self._key, signing_input.encode('ascii'), hashlib.sha256).digest())
+
+    def _encode(self, claims):
+        signing_input = f"{self._header}.{_b64encode(json.dumps(claims, separators=(',', ':')).encode())}"
+        return f"{signing_input}.{self._sign(signing_input)}"
+
+    def issue(self, user):
+        """Returns {'access': ..., 'refresh': ...} tokens for user."""
+        now = int(time.time())
+        base = {'sub': user['email'], 'name': user.get('name'), 'role': user.get('role'), 'iat': now}
+        self.stats['issued'] += 1
+        return {
+            'access': self._encode(dict(base, type='access', exp=now + self.access_ttl, jti=secrets.token_hex(8))),
+            'refresh': self._encode(dict(base, type='refresh', exp=now + self.refresh_ttl, jti=secrets.token_hex(8))),
+        }
+
+    def decode(self, token, token_type='access'):
+        """Returns the claims of a valid token of token_type, or raises TokenError."""
+        now = time.time()
+        with self._lock:
+            claims = self._decoded.get(token)
+            if claims is not None:
+                self._decoded.move_to_end(token)
+                self.stats['hits'] += 1
+            else:
+                self.stats['misses'] += 1
+                claims = self._verify(token)
+                self._decoded[token] = claims
+                if len(self._decoded) > self.cache_size:
+                    self._decoded.popitem(last=False)
+            if claims.get('type') != token_type or claims.get('exp', 0) <= now:
+                self.stats['invalid'] += 1
+                raise TokenError("Token is invalid or expired")
+            if claims.get('jti') in self._revoked:
+                self.stats['invalid'] += 1
+                raise TokenError("Token has been revoked")
+        return claims
+
+    def _verify(self, token):
+        try:
+            signing_input, _, signature = token.rpartition('.')
+            header, _, payload = signing_input.partition('.')
+            if header != self._header or not hmac.compare_digest(signature, self._sign(signing_input)):
+                raise TokenError("Token signature is invalid")
+            claims = json.loads(_b64decode(payload))
+        except (ValueError, UnicodeError) as e:
+            self.stats['invalid'] += 1
+            raise TokenError("Token is malformed") from e
+        except TokenError:
+            self.stats['invalid'] += 1
+            raise
+        if not isinstance(claims, dict):
+            self.stats['invalid'] += 1
+            raise TokenError("Token is malformed")
+        return claims
+
+    def revoke(self, claims):
+        """Rejects the token with these claims from now on."""
+        now = time.time()
+        with self._lock:
+            self._revoked[claims['jti']] = claims['exp']
+            self.stats['revoked'] += 1
+            # Forget revocations of tokens that have expired anyway
+            if len(self._revoked) > self.cache_size:
+                self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+
+    def token_stats(self):
+        with self._lock:
+            return dict(self.stats, cached=len(self._decoded), revocations=len(self._revoked))
+
+
+def bearer_token(authorization):
+    """Returns the token from an 'Authorization: JWT <token>' (or Bearer) header, or raises TokenError."""
+    scheme, _, token = (authorization or '').partition(' ')
+    if scheme not in ('JWT', 'Bearer') or not token.strip():
+        raise TokenError("Authentication credentials were not provided")
+    return token.strip()
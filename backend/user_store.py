@@ -0,0 +1,294 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Define the path to the users database file
+USERS_DB = os.path.join(os.path.dirname(__file__), 'users.db')
+
+# Legacy flat JSON file, imported once into the database on first start
+LEGACY_USERS_FILE = os.path.join(os.path.dirname(__file__), 'users.json')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    email TEXT NOT NULL UNIQUE,
+    data TEXT NOT NULL,
+    seq INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Every insert or update stamps its rows with the next write sequence number
+NEXT_SEQ = "(SELECT COALESCE(MAX(seq), 0) + 1 FROM users)"
+
+
+class UserStore:
+    """SQLite-backed user table with a unique index on email.
+
+    Each user is stored as its JSON record next to an indexed email column, so
+    inserts cost O(log n) instead of rewriting the whole file.
+    SQLite's WAL journal and the UNIQUE constraint keep concurrent uvicorn
+    workers from losing or duplicating signups.
+
+    Reads are served from a process-wide dict from email to the user's JSON
+    text, decoded on lookup: a string per user takes a fraction of the memory
+    of a dict per user, and lookups return a fresh copy for free. Writes made
+    through this store update the dict directly; writes from other processes
+    bump SQLite's data_version, and the next lookup reads just the rows they
+    wrote.
+
+    Each write stamps its rows with an increasing seq number, which is how
+    that lookup, and indexes built from the users through changes_since(),
+    find every process's writes without reading the whole table. Only
+    replace_all() forces a full reload.
+    """
+
+    def __init__(self, db_path=USERS_DB, legacy_json_path=LEGACY_USERS_FILE):
+        self.db_path = db_path
+        self.legacy_json_path = legacy_json_path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._index = None
+        self._data_version = None
+        self._cursor = None
+        self._listeners = []
+        self.stats = {'hits': 0, 'misses': 0, 'reloads': 0, 'refreshes': 0}
+
+    def _connect(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+            self._add_seq_column()
+            self._migrate_legacy_json()
+        return self._conn
+
+    def _add_seq_column(self):
+        """Adds the seq column to a users table created before it existed."""
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(users)")]
+            if 'seq' not in columns:
+                conn.execute("ALTER TABLE users ADD COLUMN seq INTEGER NOT NULL DEFAULT 0")
+            conn.execute("CREATE INDEX IF NOT EXISTS users_seq ON users (seq)")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _migrate_legacy_json(self):
+        """Imports the legacy users.json once, the first time the database is opened."""
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            done = conn.execute("SELECT value FROM meta WHERE key = 'legacy_json_migrated'").fetchone()
+            if done is None:
+                users = []
+                if self.legacy_json_path and os.path.exists(self.legacy_json_path):
+                    with open(self.legacy_json_path, 'r') as f:
+                        content = f.read()
+                    if content.strip():
+                        # Let a corrupt file fail loudly rather than migrating nothing
+                        users = json.loads(content)
+                conn.executemany(
+                    "INSERT OR IGNORE INTO users (email, data) VALUES (?, ?)",
+                    [(user['email'], json.dumps(user)) for user in users if user.get('email')],
+                )
+                conn.execute("INSERT INTO meta (key, value) VALUES ('legacy_json_migrated', ?)", (str(len(users)),))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def add_listener(self, callback):
+        """Registers callback(user) to be called after each user added through this store."""
+        self._listeners.append(callback)
+
+    def _notify(self, user):
+        for callback in self._listeners:
+            try:
+                callback(user)
+            except Exception as e:
+                logger.exception("Error in user store listener: %s", e)
+
+    def _read_changes(self, cursor):
+        """Returns ([(email, data)], cursor, full) for the rows written since cursor; see changes_since()."""
+        conn = self._connect()
+        row = conn.execute("SELECT value FROM meta WHERE key = 'users_generation'").fetchone()
+        generation = row[0] if row else '0'
+        full = cursor is None or cursor[0] != generation
+        if full:
+            # Signup order, for all()
+            rows = conn.execute("SELECT email, data, seq FROM users ORDER BY id").fetchall()
+            seq = max((row[2] for row in rows), default=-1)
+        else:
+            seq = cursor[1]
+            rows = conn.execute(
+                "SELECT email, data, seq FROM users WHERE seq > ? ORDER BY seq, id", (seq,)
+            ).fetchall()
+            if rows:
+                seq = rows[-1][2]
+        return [(email, data) for email, data, _ in rows], (generation, seq), full
+
+    def _fresh_index(self):
+        """Returns the email index, patching in the rows other connections wrote since the last lookup."""
+        conn = self._connect()
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if self._index is None or version != self._data_version:
+            with metrics.stage('db_read'):
+                rows, cursor, full = self._read_changes(None if self._index is None else self._cursor)
+            if full:
+                self._index = dict(rows)
+                self.stats['reloads'] += 1
+            else:
+                self._index.update(rows)
+                self.stats['refreshes'] += 1
+            self._cursor = cursor
+            self._data_version = version
+        return self._index
+
+    def get(self, email):
+        """Returns the user with the given email, or None."""
+        with self._lock:
+            data = self._fresh_index().get(email)
+            self.stats['hits' if data is not None else 'misses'] += 1
+        return json.loads(data) if data is not None else None
+
+    def add(self, user):
+        """Inserts a new user. Returns False if the email is already taken."""
+        data = json.dumps(user)
+        with self._lock:
+            try:
+                self._connect().execute(
+                    "INSERT INTO users (email, data, seq) VALUES (?, ?, %s)" % NEXT_SEQ, (user['email'], data)
+                )
+            except sqlite3.IntegrityError:
+                return False
+            if self._index is not None:
+                self._index[user['email']] = data
+        self._notify(user)
+        return True
+
+    def add_many(self, users):
+        """Inserts users in a single transaction.
+
+        Returns one bool per user: False if its email was already taken, either
+        in the store or earlier in the same batch.
+        """
+        created = []
+        with self._lock:
+            conn = self._connect()
+            # Take the write lock first so no other worker can insert between the check and the insert
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                index = self._fresh_index()
+                batch_emails = set()
+                rows = []
+                for user in users:
+                    email = user['email']
+                    ok = email not in index and email not in batch_emails
+                    if ok:
+                        batch_emails.add(email)
+                        rows.append((email, json.dumps(user)))
+                    created.append(ok)
+                seq = conn.execute("SELECT " + NEXT_SEQ).fetchone()[0]
+                conn.executemany("INSERT INTO users (email, data, seq) VALUES (?, ?, ?)", [row + (seq,) for row in rows])
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            index.update(rows)
+        for user, ok in zip(users, created):
+            if ok:
+                self._notify(user)
+        return created
+
+    def update(self, email, changes):
+        """Merges changes into the stored user with the given email. Returns the updated user, or None."""
+        with self._lock:
+            index = self._fresh_index()
+            data = index.get(email)
+            if data is None:
+                return None
+            user = dict(json.loads(data), **changes)
+            data = json.dumps(user)
+            self._connect().execute("UPDATE users SET data = ?, seq = %s WHERE email = ?" % NEXT_SEQ, (data, email))
+            index[email] = data
+        return user
+
+    def all(self):
+        """Returns every user in signup order."""
+        with self._lock:
+            rows = list(self._fresh_index().values())
+        return [json.loads(data) for data in rows]
+
+    def changes_since(self, cursor=None):
+        """Returns (users, cursor, full): the users written since cursor, by any process, in write order.
+
+        Pass the returned cursor to the next call. full is True when users is
+        the whole table instead, on the first call or after replace_all()
+        removed users, and whatever was built from earlier changes should be
+        rebuilt from it.
+        """
+        with self._lock:
+            rows, cursor, full = self._read_changes(cursor)
+        return [json.loads(data) for _, data in rows], cursor, full
+
+    def replace_all(self, users):
+        """Replaces the whole user table in a single transaction."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                seq = conn.execute("SELECT " + NEXT_SEQ).fetchone()[0]
+                conn.execute("DELETE FROM users")
+                conn.executemany(
+                    "INSERT OR REPLACE INTO users (email, data, seq) VALUES (?, ?, ?)",
+                    [(user['email'], json.dumps(user), seq) for user in users],
+                )
+                # Tells changes_since() callers that users were removed
+                conn.execute(
+                    "INSERT INTO meta (key, value) VALUES ('users_generation', '1') "
+                    "ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            finally:
+                self._index = None
+
+    def count(self):
+        with self._lock:
+            return len(self._fresh_index())
+
+    def cache_stats(self):
+        """Returns the hit/miss/reload counters and the number of cached users."""
+        with self._lock:
+            return dict(self.stats, size=len(self._index) if self._index is not None else 0)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+                self._index = None
+
+
+if __name__ == "__main__":
+    # One-shot migration: python user_store.py
+    store = UserStore()
+    print(f"{store.count()} users in {store.db_path}")
@@ -1,10 +1,62 @@
+import argparse
+import csv
 import json
 import os
 import datetime
+import sys
+import time
+
+# Share the backend's password hashing so both write the same hash format
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+from json_store import JsonFileStore
+from passwords import PasswordHasher
 
 # Path to the JSON file
 USERS_FILE = os.path.join(os.path.dirname(__file__), 'users.json')
 
+# Locked, atomic read-modify-write of users.json
+users_store = JsonFileStore(USERS_FILE)
+
+password_hasher = PasswordHasher(
+    n=int(os.getenv("PASSWORD_SCRYPT_N", str(2 ** 14))),
+    r=int(os.getenv("PASSWORD_SCRYPT_R", "8")),
+    p=int(os.getenv("PASSWORD_SCRYPT_P", "1")),
+)
+
+def _build_user(role, name, email, password, **additional_details):
+    """Creates the user dictionary stored for a signup."""
+    new_user = {
+        'role': role,
+        'name': name,  # Full name for seeker, Company name for employer
+        'email': email,
+        'password': password,  # Already hashed by the caller
+        'created_at': str(datetime.datetime.now()),  # Add timestamp for when user was created
+    }
+
+    # Add role-specific fields
+    if role == 'seeker':
+        new_user.update({
+            'full_name': name,
+            'job_title': additional_details.get('job_title', ''),
+            'experience': additional_details.get('experience', ''),
+            'skills': additional_details.get('skills', []),
+            'location': additional_details.get('location', ''),
+            'phone': additional_details.get('phone', ''),
+            'resume_url': additional_details.get('resume_url', '')
+        })
+    else:  # employer
+        new_user.update({
+            'company_name': name,
+            'industry': additional_details.get('industry', ''),
+            'company_size': additional_details.get('company_size', ''),
+            'company_website': additional_details.get('company_website', ''),
+            'company_location': additional_details.get('company_location', ''),
+            'company_description': additional_details.get('company_description', ''),
+            'contact_person': additional_details.get('contact_person', ''),
+            'phone': additional_details.get('phone', '')
+        })
+    return new_user
+
 def signup_user(role, name, email, password, **additional_details):
     """
     Add a new user to the users.json file.
@@ -25,60 +77,21 @@ def signup_user(role, name, email, password, **additional_details):
             print("Invalid role. Must be either 'seeker' or 'employer'")
             return False
 
-        # Check if the file exists, if not create it with an empty list
-        if not os.path.exists(USERS_FILE):
-            with open(USERS_FILE, 'w') as f:
-                json.dump([], f)
-        
-        # Read existing users
-        with open(USERS_FILE, 'r') as f:
-            users = json.load(f)
-        
-        # Check if email already exists
-        for user in users:
-            if user['email'] == email:
-                print("Email already exists.")
-                return False
-        
         # Create new user dictionary with role-specific details
-        new_user = {
-            'role': role,
-            'name': name,  # Full name for seeker, Company name for employer
-            'email': email,
-            'password': password,  # Note: In a real application, you should hash the password!
-            'created_at': str(datetime.datetime.now()),  # Add timestamp for when user was created
-        }
-
-        # Add role-specific fields
-        if role == 'seeker':
-            new_user.update({
-                'full_name': name,
-                'job_title': additional_details.get('job_title', ''),
-                'experience': additional_details.get('experience', ''),
-                'skills': additional_details.get('skills', []),
-                'location': additional_details.get('location', ''),
-                'phone': additional_details.get('phone', ''),
-                'resume_url': additional_details.get('resume_url', '')
-            })
-        else:  # employer
-            new_user.update({
-                'company_name': name,
-                'industry': additional_details.get('industry', ''),
-                'company_size': additional_details.get('company_size', ''),
-                'company_website': additional_details.get('company_website', ''),
-                'company_location': additional_details.get('company_location', ''),
-                'company_description': additional_details.get('company_description', ''),
-                'contact_person': additional_details.get('contact_person', ''),
-                'phone': additional_details.get('phone', '')
-            })
-        
-        # Add new user to the list
-        users.append(new_user)
-        
-        # Write updated users list back to the file
-        with open(USERS_FILE, 'w') as f:
-            json.dump(users, f, indent=4)
-        
+        new_user = _build_user(role, name, email, password_hasher.hash(password), **additional_details)
+
+        def add(users):
+            # Check if email already exists
+            if any(user['email'] == email for user in users):
+                return False
+            users.append(new_user)
+            return True
+
+        # Read, check and write back under the users file lock, so concurrent signups can't lose each other
+        if not users_store.update(add):
+            print("Email already exists.")
+            return False
+
         print(f"{role.capitalize()} {name} signed up successfully!")
         return True
         
@@ -86,8 +99,139 @@ def signup_user(role, name, email, password, **additional_details):
         print(f"An error occurred during signup: {e}")
         return False
 
+def signup_users_bulk(records, users_file=USERS_FILE):
+    """
+    Add many users to the users.json file in one pass.
+
+    The API only reads users.json the first time it creates its user store;
+    import_users() is the route for users who should be able to log in.
+
+    Every record is validated and checked against a set of known emails,
+    passwords are hashed in parallel, and all valid users are appended in a
+    single locked, atomic write.
+
+    Args:
+        records (iterable): Dicts with 'role', 'name', 'email', 'password' and role-specific details
+        users_file (str): The JSON file to import into
+
+    Returns:
+        dict: 'created' and 'failed' counts, per-row 'errors', 'seconds' and 'records_per_sec'.
+    """
+    start = time.perf_counter()
+    store = users_store if users_file == USERS_FILE else JsonFileStore(users_file)
+    # Skip known emails before paying for their password hash; rechecked under the lock below
+    emails = {user.get('email') for user in store.read(default=[])}
+
+    new_users, rows, errors, total = [], [], [], 0
+    for row, record in enumerate(records, start=1):
+        total += 1
+        details = dict(record)
+        role, name, email, password = (details.pop(key, None) for key in ('role', 'name', 'email', 'password'))
+        if role not in ['seeker', 'employer']:
+            errors.append({'row': row, 'email': email, 'detail': "Invalid role. Must be either 'seeker' or 'employer'"})
+        elif not email or not name or not password:
+            errors.append({'row': row, 'email': email, 'detail': "Missing name, email or password."})
+        elif email in emails:
+            errors.append({'row': row, 'email': email, 'detail': "Email already exists."})
+        else:
+            emails.add(email)
+            new_users.append(_build_user(role, name, email, password, **details))
+            rows.append(row)
+
+    # Hash the new users' passwords in parallel once all rows are validated
+    for user, hashed in zip(new_users, password_hasher.hash_many([user['password'] for user in new_users])):
+        user['password'] = hashed
+
+    def add_all(users):
+        # Another writer may have added some of these emails since the read above
+        existing = {user.get('email') for user in users}
+        added = 0
+        for row, user in zip(rows, new_users):
+            if user['email'] in existing:
+                errors.append({'row': row, 'email': user['email'], 'detail': "Email already exists."})
+            else:
+                users.append(user)
+                added += 1
+        return added
+
+    created = store.update(add_all) if new_users else 0
+    errors.sort(key=lambda error: error['row'])
+
+    seconds = time.perf_counter() - start
+    return {
+        'created': created,
+        'failed': len(errors),
+        'errors': errors,
+        'seconds': seconds,
+        'records_per_sec': total / seconds if seconds > 0 else None,
+    }
+
+def import_users(records):
+    """
+    Signs up many users in the backend's user store, the one the API logs users in from.
+
+    Rows go through the same validation, duplicate checks and password
+    hashing as POST /api/signup/bulk. A row without 're_password' is taken
+    to confirm its own password.
+
+    Args:
+        records (iterable): Dicts with the signup API's fields
+
+    Returns:
+        dict: 'created' and 'failed' counts, per-row 'errors' (rows numbered from 1), 'seconds' and 'records_per_sec'.
+    """
+    import asyncio
+    # Imported here: the backend app reads its configuration from the environment on import
+    import main
+
+    rows = []
+    for record in records:
+        record = dict(record)
+        record.setdefault('re_password', record.get('password'))
+        rows.append(record)
+    report = asyncio.run(main.import_signups(rows))
+    for error in report['errors']:
+        error['row'] += 1
+    return report
+
+def read_records(path):
+    """Streams signup records from a CSV (with a header row) or JSONL file."""
+    if path.endswith('.csv'):
+        with open(path, newline='') as f:
+            for record in csv.DictReader(f):
+                record = {key: value for key, value in record.items() if value not in (None, '')}
+                if 'skills' in record:
+                    # Skills are separated with ';' so they can share a cell with the CSV commas
+                    record['skills'] = [s.strip() for s in record['skills'].split(';') if s.strip()]
+                yield record
+    else:
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
 # Example usage
+#   python signup.py                          run the example signups below
+#   python signup.py --import partners.csv    bulk import a CSV or JSONL file into the backend's user store
+#   python signup.py --import partners.csv --users-file users.json
+#                                             import into a legacy users JSON file instead
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sign up users.")
+    parser.add_argument('--import', dest='import_file', help="CSV or JSONL file of users to import")
+    parser.add_argument('--users-file', help="legacy users JSON file to import into instead of the user store")
+    args = parser.parse_args()
+
+    if args.import_file:
+        if args.users_file:
+            report = signup_users_bulk(read_records(args.import_file), users_file=args.users_file)
+        else:
+            report = import_users(read_records(args.import_file))
+        for error in report['errors']:
+            print(f"Row {error['row']} ({error['email']}): {error['detail']}")
+        print(f"Imported {report['created']} users, {report['failed']} failed, "
+              f"in {report['seconds']:.2f}s ({report['records_per_sec'] or 0:.0f} records/sec)")
+        raise SystemExit(0)
+
     # Example seeker signup
     seeker_details = {
         'job_title': 'Software Developer',